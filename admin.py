@@ -0,0 +1,717 @@
+"""Admin pages and APIs: employees, rotas, shift templates and holidays, attendance records, site switching and diagnostics."""
+import json
+from datetime import datetime
+
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, jsonify, session, send_file
+from flask_login import login_required, current_user
+
+import schedules
+import sharding
+from archive import attendance_for_range, purge_archived_attendance
+from auth import can_switch_site, email_exists, username_exists
+from emails import send_welcome_email, send_password_change_email
+from models import db, User, Attendance, Rota, RotaOverride, Holiday, ShiftTemplate, ShiftTemplateDay, ChangeLog, \
+    MonthlyHours
+from password_hashing import password_hasher
+from profiler import request_profiler
+from read_routing import read_only
+from reports import month_bounds
+from shift_templates import apply_shift_template
+from sql_instrumentation import sql_instrumentation
+
+bp = Blueprint('admin', __name__)
+
+
+@bp.route('/admin/dashboard')
+@login_required
+@read_only
+def dashboard():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+    
+    total_employees = User.query.filter_by(role='employee').count()
+    today = datetime.utcnow().date()
+    present_today = db.session.query(Attendance).filter(
+        Attendance.date == today,
+        Attendance.status == 'present'
+    ).count()
+    
+    return render_template('admin_dashboard.html', 
+                         total_employees=total_employees,
+                         present_today=present_today)
+
+
+@bp.route('/admin/site', methods=['POST'])
+@login_required
+def switch_site():
+    if not can_switch_site(current_user):
+        return redirect(url_for('auth.index'))
+    site = request.form.get('site')
+    if site == sharding.ALL_SITES or site in sharding.sites():
+        session['site'] = site
+    return redirect(request.referrer or url_for('admin.dashboard'))
+
+
+@bp.route('/admin/employees')
+@login_required
+def manage_employees():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+    
+    # Filters
+    page = request.args.get('page', 1, type=int)
+    username_q = request.args.get('username', '', type=str)
+    role_filter = request.args.get('role', 'employee', type=str)
+    status_filter = request.args.get('status', '', type=str)  # '', 'active', 'inactive'
+
+    query = User.query
+
+    # Role filter (admin or employee)
+    if role_filter in ('admin', 'employee'):
+        query = query.filter(User.role == role_filter)
+
+    # Username search
+    if username_q:
+        like = f"%{username_q}%"
+        query = query.filter((User.username.ilike(like)) | (User.full_name.ilike(like)) | (User.email.ilike(like)))
+
+    # Status filter
+    if status_filter == 'active':
+        query = query.filter(User.is_active.is_(True))
+    elif status_filter == 'inactive':
+        query = query.filter(User.is_active.is_(False))
+
+    query = query.order_by(User.full_name.asc())
+    employees = query.paginate(page=page, per_page=10)
+
+    return render_template('manage_employees.html', 
+                           employees=employees,
+                           username_q=username_q,
+                           role_filter=role_filter,
+                           status_filter=status_filter)
+
+@bp.route('/admin/employees/delete-bulk', methods=['POST'])
+@login_required
+def delete_employees_bulk():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+
+    ids = request.form.getlist('ids')
+    deleted_ids = []
+    for id_str in ids:
+        try:
+            uid = int(id_str)
+        except ValueError:
+            continue
+
+        user = User.query.get(uid)
+        if not user:
+            continue
+        # Skip admins and self
+        if user.role == 'admin' or user.id == current_user.id:
+            continue
+        db.session.delete(user)
+        deleted_ids.append(user.id)
+
+    if deleted_ids:
+        purge_archived_attendance(deleted_ids)
+        db.session.commit()
+
+    return redirect(url_for('admin.manage_employees'))
+
+
+@bp.route('/delete_employee/<int:employee_id>', methods=['POST'])
+@login_required
+def delete_employee(employee_id):
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    
+    user = User.query.get(employee_id)
+    if not user:
+        return jsonify({'success': False, 'message': 'Employee not found'}), 404
+    
+    # Prevent deleting admins or self
+    if user.role == 'admin':
+        return jsonify({'success': False, 'message': 'Cannot delete admin users'}), 403
+    
+    if user.id == current_user.id:
+        return jsonify({'success': False, 'message': 'Cannot delete yourself'}), 403
+    
+    try:
+        db.session.delete(user)
+        purge_archived_attendance([user.id])
+        db.session.commit()
+        return jsonify({'success': True, 'message': 'Employee deleted successfully'})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@bp.route('/admin/employee/<int:employee_id>')
+@login_required
+def view_employee(employee_id):
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+    
+    employee = User.query.get_or_404(employee_id)
+    if employee.role != 'employee':
+        return redirect(url_for('admin.manage_employees'))
+    
+    month = request.args.get('month', datetime.utcnow().month, type=int)
+    year = request.args.get('year', datetime.utcnow().year, type=int)
+    
+    first_day, last_day = month_bounds(month, year)
+    Att = attendance_for_range(first_day, last_day)
+    records = db.session.query(Att).filter(
+        Att.user_id == employee_id,
+        Att.date >= first_day,
+        Att.date <= last_day
+    ).order_by(Att.date.desc()).all()
+    totals = db.session.get(MonthlyHours, (employee_id, year, month))
+    
+    return render_template('view_employee.html', employee=employee, records=records, month=month, year=year,
+                           totals=totals)
+
+
+def normalize_department(name):
+    """Trim and collapse whitespace in a department name; blank becomes None"""
+    name = ' '.join((name or '').split())
+    return name or None
+
+
+def canonical_department(name):
+    """Normalised department name, spelled like an existing department that differs only in case"""
+    name = normalize_department(name)
+    if name is None:
+        return None
+    existing = db.session.query(User.department).filter(
+        db.func.lower(User.department) == name.lower()
+    ).group_by(User.department).order_by(db.func.count().desc()).first()
+    return existing[0] if existing else name
+
+
+def department_names():
+    """Distinct department names in use, read from the (role, department) index"""
+    return [row[0] for row in db.session.query(User.department).filter(
+        User.role == 'employee', User.department.isnot(None)
+    ).group_by(User.department)]
+
+
+@bp.route('/admin/add-employee', methods=['GET', 'POST'])
+@login_required
+def add_employee():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+    
+    employee_id = request.args.get('id', type=int)
+    employee = None
+    
+    # If editing, fetch the employee
+    if employee_id:
+        employee = User.query.get_or_404(employee_id)
+        if employee.role == 'admin':
+            return redirect(url_for('admin.manage_employees'))
+    
+    if request.method == 'POST':
+        username = request.form.get('username')
+        email = request.form.get('email')
+        full_name = request.form.get('full_name')
+        password = request.form.get('password')
+        department = canonical_department(request.form.get('department'))
+        is_active = request.form.get('is_active') == 'on'
+
+        if employee:
+            # Editing existing employee
+            # Check if username changed and if new username exists
+            if employee.username != username:
+                if sharding.any_site(username_exists, username):
+                    return render_template('add_employee.html', employee=employee, departments=department_names(), error='Username already exists')
+            
+            # Check if email changed and if new email exists
+            if employee.email != email:
+                if sharding.any_site(email_exists, email):
+                    return render_template('add_employee.html', employee=employee, departments=department_names(), error='Email already exists')
+            
+            employee.username = username
+            employee.email = email
+            employee.full_name = full_name
+            employee.department = department
+            employee.is_active = is_active
+            
+            # Only update password if provided
+            if password:
+                employee.set_password(password)
+                db.session.commit()
+                # Send password change notification
+                send_password_change_email(employee)
+            else:
+                db.session.commit()
+        else:
+            # Adding new employee; usernames and emails must be unique across sites,
+            # since login finds the user's site by username
+            if sharding.any_site(username_exists, username):
+                return render_template('add_employee.html', departments=department_names(), error='Username already exists')
+            
+            if sharding.any_site(email_exists, email):
+                return render_template('add_employee.html', departments=department_names(), error='Email already exists')
+
+            employee = User(
+                username=username,
+                email=email,
+                full_name=full_name,
+                department=department,
+                role='employee',
+                is_active=True
+            )
+            employee.set_password(password)
+            db.session.add(employee)
+            db.session.commit()
+            
+            # Send welcome email with credentials
+            send_welcome_email(employee, password)
+        
+        db.session.commit()
+        return redirect(url_for('admin.manage_employees'))
+
+    return render_template('add_employee.html', employee=employee, departments=department_names())
+
+
+@bp.route('/admin/rotas')
+@login_required
+def manage_rotas():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+    
+    employees = User.query.filter_by(role='employee').all()
+    return render_template('manage_rotas.html', employees=employees)
+
+
+@bp.route('/admin/employee/<int:employee_id>/rotas', methods=['GET', 'POST'])
+@login_required
+def employee_rotas(employee_id):
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+    
+    employee = User.query.get_or_404(employee_id)
+    
+    if request.method == 'POST':
+        day_of_week = request.form.get('day_of_week')
+        shift_start = request.form.get('shift_start')
+        shift_end = request.form.get('shift_end')
+        
+        # Check if rota already exists for this day
+        existing_rota = Rota.query.filter_by(
+            user_id=employee_id,
+            day_of_week=day_of_week,
+            is_active=True
+        ).first()
+        
+        if existing_rota:
+            # Update existing rota
+            existing_rota.shift_start = datetime.strptime(shift_start, '%H:%M').time()
+            existing_rota.shift_end = datetime.strptime(shift_end, '%H:%M').time()
+        else:
+            # Create new rota
+            rota = Rota(
+                user_id=employee_id,
+                day_of_week=day_of_week,
+                shift_start=datetime.strptime(shift_start, '%H:%M').time(),
+                shift_end=datetime.strptime(shift_end, '%H:%M').time()
+            )
+            db.session.add(rota)
+        
+        db.session.commit()
+        return redirect(url_for('admin.employee_rotas', employee_id=employee_id))
+
+    return render_employee_rotas(employee)
+
+
+def render_employee_rotas(employee, error=None):
+    rotas = Rota.query.filter_by(user_id=employee.id, is_active=True).order_by(
+        db.case(
+            (Rota.day_of_week == 'Monday', 1),
+            (Rota.day_of_week == 'Tuesday', 2),
+            (Rota.day_of_week == 'Wednesday', 3),
+            (Rota.day_of_week == 'Thursday', 4),
+            (Rota.day_of_week == 'Friday', 5),
+            (Rota.day_of_week == 'Saturday', 6),
+            (Rota.day_of_week == 'Sunday', 7),
+        )
+    ).all()
+    
+    days_of_week = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    
+    overrides = RotaOverride.query.filter_by(user_id=employee.id).order_by(RotaOverride.date_from.desc()).all()
+
+    return render_template('employee_rotas.html', employee=employee, rotas=rotas, days_of_week=days_of_week,
+                           overrides=overrides, error=error)
+
+
+@bp.route('/admin/rota/<int:rota_id>/delete', methods=['POST'])
+@login_required
+def delete_rota(rota_id):
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    
+    rota = Rota.query.get_or_404(rota_id)
+    employee_id = rota.user_id
+    db.session.delete(rota)
+    db.session.commit()
+    
+    return redirect(url_for('admin.employee_rotas', employee_id=employee_id))
+
+
+@bp.route('/admin/employee/<int:employee_id>/rota-overrides', methods=['POST'])
+@login_required
+def add_rota_override(employee_id):
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+
+    employee = User.query.get_or_404(employee_id)
+    try:
+        date_from = datetime.strptime(request.form.get('date_from', ''), '%Y-%m-%d').date()
+        date_to = datetime.strptime(request.form.get('date_to') or request.form.get('date_from', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return render_employee_rotas(employee, error='Enter the dates as YYYY-MM-DD')
+    shift_start = request.form.get('shift_start')
+    shift_end = request.form.get('shift_end')
+
+    # Leaving both times empty gives the employee those days off
+    if bool(shift_start) != bool(shift_end):
+        return render_employee_rotas(employee, error='Enter both start and end time, or neither for days off')
+    if date_to < date_from:
+        return render_employee_rotas(employee, error='End date is before start date')
+    existing = schedules.overlapping_override(employee_id, date_from, date_to)
+    if existing:
+        return render_employee_rotas(
+            employee, error=f'Overlaps the override from {existing.date_from} to {existing.date_to}; remove it first')
+
+    db.session.add(RotaOverride(
+        user_id=employee_id,
+        date_from=date_from,
+        date_to=date_to,
+        shift_start=datetime.strptime(shift_start, '%H:%M').time() if shift_start else None,
+        shift_end=datetime.strptime(shift_end, '%H:%M').time() if shift_end else None,
+        reason=request.form.get('reason', '').strip() or None
+    ))
+    db.session.commit()
+    return redirect(url_for('admin.employee_rotas', employee_id=employee_id))
+
+
+@bp.route('/admin/rota-override/<int:override_id>/delete', methods=['POST'])
+@login_required
+def delete_rota_override(override_id):
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+
+    override = RotaOverride.query.get_or_404(override_id)
+    employee_id = override.user_id
+    db.session.delete(override)
+    db.session.commit()
+
+    return redirect(url_for('admin.employee_rotas', employee_id=employee_id))
+
+
+@bp.route('/admin/shift-templates', methods=['GET', 'POST'])
+@login_required
+def shift_templates():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+
+    days_of_week = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    error = None
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        days = {}
+        for day in days_of_week:
+            shift_start = request.form.get(f'shift_start_{day}')
+            shift_end = request.form.get(f'shift_end_{day}')
+            if bool(shift_start) != bool(shift_end):
+                error = f'Enter both start and end time for {day}, or neither for a day off'
+            elif shift_start:
+                days[day] = (datetime.strptime(shift_start, '%H:%M').time(),
+                             datetime.strptime(shift_end, '%H:%M').time())
+        if not name:
+            error = 'Enter a name for the template'
+        elif not error and not days:
+            error = 'Enter at least one working day'
+        if not error:
+            # Saving under an existing name replaces that template's pattern
+            # (updated in place by weekday: new rows would be inserted before the old ones are
+            # deleted and break the unique (template_id, day_of_week) constraint)
+            template = ShiftTemplate.query.filter_by(name=name).first() or ShiftTemplate(name=name)
+            existing = {template_day.day_of_week: template_day for template_day in template.days}
+            for day, (start, end) in days.items():
+                if day in existing:
+                    existing[day].shift_start, existing[day].shift_end = start, end
+                else:
+                    template.days.append(ShiftTemplateDay(day_of_week=day, shift_start=start, shift_end=end))
+            for day, template_day in existing.items():
+                if day not in days:
+                    template.days.remove(template_day)
+            db.session.add(template)
+            db.session.commit()
+            return redirect(url_for('admin.shift_templates'))
+
+    return render_shift_templates(error=error)
+
+
+def render_shift_templates(error=None, result=None):
+    templates = ShiftTemplate.query.options(db.selectinload(ShiftTemplate.days)).order_by(ShiftTemplate.name).all()
+    employees = db.session.query(User.id, User.full_name, User.department).filter(
+        User.role == 'employee', User.is_active == True).order_by(User.full_name).all()
+    days_of_week = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    return render_template('shift_templates.html', templates=templates, employees=employees,
+                           departments=department_names(), days_of_week=days_of_week, error=error, result=result)
+
+
+@bp.route('/admin/shift-templates/apply', methods=['POST'])
+@login_required
+def apply_template():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+
+    template = ShiftTemplate.query.get_or_404(request.form.get('template_id', type=int))
+    department = canonical_department(request.form.get('department'))
+    try:
+        counts = apply_shift_template(
+            template.id, request.form.getlist('employee_ids', type=int), department)
+    except ValueError as e:
+        return render_shift_templates(error=str(e))
+    return render_shift_templates(result=dict(counts, template=template.name))
+
+
+@bp.route('/admin/shift-template/<int:template_id>/delete', methods=['POST'])
+@login_required
+def delete_shift_template(template_id):
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+
+    db.session.delete(ShiftTemplate.query.get_or_404(template_id))
+    db.session.commit()
+    return redirect(url_for('admin.shift_templates'))
+
+
+@bp.route('/admin/holidays', methods=['GET', 'POST'])
+@login_required
+def holidays():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+
+    error = None
+    if request.method == 'POST':
+        try:
+            day = datetime.strptime(request.form.get('date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            day = None
+            error = 'Enter the date as YYYY-MM-DD'
+        name = request.form.get('name', '').strip()
+        if day and not name:
+            error = 'Enter a name for the holiday'
+        elif day and Holiday.query.filter_by(date=day).first():
+            error = f'{day} is already a holiday'
+        if not error:
+            db.session.add(Holiday(date=day, name=name))
+            db.session.commit()
+            return redirect(url_for('admin.holidays'))
+
+    holidays = Holiday.query.order_by(Holiday.date.desc()).all()
+    return render_template('holidays.html', holidays=holidays, error=error)
+
+
+@bp.route('/admin/holiday/<int:holiday_id>/delete', methods=['POST'])
+@login_required
+def delete_holiday(holiday_id):
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+
+    db.session.delete(Holiday.query.get_or_404(holiday_id))
+    db.session.commit()
+    return redirect(url_for('admin.holidays'))
+
+
+@bp.route('/admin/attendance-records')
+@login_required
+def attendance_records():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+    
+    page = request.args.get('page', 1, type=int)
+    date_from = request.args.get('date_from', '', type=str)
+    date_to = request.args.get('date_to', '', type=str)
+    
+    query = Attendance.query
+    
+    if date_from:
+        from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
+        query = query.filter(Attendance.date >= from_date)
+    
+    if date_to:
+        to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
+        query = query.filter(Attendance.date <= to_date)
+    
+    records = query.order_by(Attendance.date.desc(), Attendance.check_in.desc()).paginate(page=page, per_page=15)
+    
+    return render_template('attendance_records.html', records=records, date_from=date_from, date_to=date_to)
+
+
+@bp.route('/api/admin/stats')
+@login_required
+@read_only
+def get_stats():
+    if current_user.role != 'admin':
+        return jsonify({'success': False}), 403
+    
+    today = datetime.utcnow().date()
+    
+    stats = {
+        'total_employees': User.query.filter_by(role='employee').count(),
+        'present_today': db.session.query(Attendance).filter(
+            Attendance.date == today,
+            Attendance.status == 'present'
+        ).count(),
+        'absent_today': db.session.query(Attendance).filter(
+            Attendance.date == today,
+            Attendance.status == 'absent'
+        ).count(),
+    }
+    
+    return jsonify(stats)
+
+
+@bp.route('/api/changes')
+@login_required
+def get_changes():
+    """Change log entries after the ``since`` cursor, oldest first.
+
+    Pass the returned ``cursor`` as ``since`` on the next call; ``has_more``
+    says whether another page is already waiting.
+    """
+    if current_user.role != 'admin':
+        return jsonify({'success': False}), 403
+
+    since = request.args.get('since', 0, type=int)
+    limit = max(1, min(request.args.get('limit', 500, type=int), current_app.config['CHANGE_FEED_MAX_LIMIT']))
+    entity = request.args.get('entity', '', type=str)
+
+    query = db.select(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op,
+                      ChangeLog.user_id, ChangeLog.changed_at, ChangeLog.data).where(ChangeLog.id > since)
+    if entity:
+        query = query.where(ChangeLog.entity == entity)
+    rows = db.session.execute(query.order_by(ChangeLog.id).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    changes = [{
+        'id': change_id,
+        'entity': entity_name,
+        'key': entity_id,
+        'op': op,
+        'user_id': user_id,
+        'at': changed_at.isoformat(timespec='seconds'),
+        'data': json.loads(data) if data else None,
+    } for change_id, entity_name, entity_id, op, user_id, changed_at, data in rows]
+
+    return jsonify({
+        'changes': changes,
+        'cursor': changes[-1]['id'] if changes else since,
+        'has_more': has_more,
+    })
+
+
+@bp.route('/api/admin/password-hashing')
+@login_required
+def get_password_hashing_stats():
+    if current_user.role != 'admin':
+        return jsonify({'success': False}), 403
+
+    return jsonify(password_hasher.stats())
+
+
+@bp.route('/admin/sql-stats', methods=['GET', 'POST'])
+@login_required
+def sql_stats():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+
+    if request.method == 'POST':
+        sql_instrumentation.reset()
+        return redirect(url_for('admin.sql_stats'))
+
+    return render_template('sql_stats.html',
+                           enabled=sql_instrumentation.enabled,
+                           endpoints=sql_instrumentation.slowest_endpoints() if sql_instrumentation.enabled else [],
+                           statements=sql_instrumentation.worst_statements() if sql_instrumentation.enabled else [])
+
+
+@bp.route('/admin/profiles')
+@login_required
+def profiles():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+
+    return render_template('profiles.html', profiles=request_profiler.list(),
+                           enabled=current_app.config['PROFILER_ENABLED'])
+
+
+@bp.route('/admin/profiles/<profile_id>.<fmt>')
+@login_required
+def download_profile(profile_id, fmt):
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+
+    path = request_profiler.path(profile_id, fmt)
+    if not path:
+        return redirect(url_for('admin.profiles'))
+    mimetype = 'application/octet-stream' if fmt == 'prof' else 'text/plain'
+    return send_file(path, mimetype=mimetype, as_attachment=True, download_name=f'{profile_id}.{fmt}')
+
+
+@bp.route('/api/admin/employee-hours-today')
+@login_required
+@read_only
+def get_employee_hours_today():
+    if current_user.role != 'admin':
+        return jsonify({'success': False}), 403
+    
+    today = datetime.utcnow().date()
+    
+    # Get all employees
+    employees = User.query.filter_by(role='employee', is_active=True).all()
+    
+    employee_hours = []
+    for emp in employees:
+        attendance = Attendance.query.filter_by(
+            user_id=emp.id,
+            date=today
+        ).first()
+        
+        hours_worked = "0h 0m"
+        status = "Not Checked In"
+        
+        if attendance:
+            if attendance.check_in and attendance.check_out:
+                time_diff = attendance.check_out - attendance.check_in
+                hours = int(time_diff.total_seconds() // 3600)
+                minutes = int((time_diff.total_seconds() % 3600) // 60)
+                hours_worked = f"{hours}h {minutes}m"
+                status = "Checked Out"
+            elif attendance.check_in:
+                # Calculate current hours if still checked in
+                now = datetime.utcnow()
+                time_diff = now - attendance.check_in
+                hours = int(time_diff.total_seconds() // 3600)
+                minutes = int((time_diff.total_seconds() % 3600) // 60)
+                hours_worked = f"{hours}h {minutes}m"
+                status = "Working"
+        
+        employee_hours.append({
+            'name': emp.full_name,
+            'hours': hours_worked,
+            'status': status
+        })
+    
+    # Sort by hours worked (descending)
+    employee_hours.sort(key=lambda x: x['hours'], reverse=True)
+    
+    return jsonify({'employees': employee_hours})
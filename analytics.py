@@ -0,0 +1,191 @@
+"""Vectorized attendance analytics over arbitrary date ranges.
+
+Attendance for the range is loaded once as a handful of NumPy columns
+(user, day, status code, check-in/out as epoch seconds) and every figure is
+computed with array operations: grouping is done with ``bincount`` over
+dense group indices, and medians/percentiles are read from one sort of the
+shift lengths by (group, length). No per-row Python runs after loading.
+"""
+import numpy as np
+
+STATUSES = ('present', 'absent', 'leave', 'other')
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+SECONDS_PER_HOUR = 3600.0
+
+
+class AttendanceFrame:
+    """Column arrays for a set of attendance rows.
+
+    ``day`` is days since 1970-01-01; ``check_in``/``check_out`` are epoch
+    seconds with NaN where the punch is missing.
+    """
+
+    def __init__(self, user_id, day, status, check_in, check_out):
+        self.user_id = user_id
+        self.day = day
+        self.status = status
+        self.check_in = check_in
+        self.check_out = check_out
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (user_id, day, status code, check_in, check_out) tuples; None becomes NaN."""
+        data = np.array(rows, dtype=np.float64).reshape(-1, 5)
+        return cls(
+            user_id=data[:, 0].astype(np.int64),
+            day=data[:, 1].astype(np.int64),
+            status=data[:, 2].astype(np.int64),
+            check_in=data[:, 3],
+            check_out=data[:, 4],
+        )
+
+    @classmethod
+    def concatenate(cls, frames):
+        """One frame holding the rows of all ``frames``"""
+        return cls(*(np.concatenate([getattr(f, name) for f in frames])
+                     for name in ('user_id', 'day', 'status', 'check_in', 'check_out')))
+
+    def __len__(self):
+        return len(self.user_id)
+
+    @property
+    def shift_seconds(self):
+        """Worked seconds per row, NaN unless both punches exist and check-out is after check-in."""
+        seconds = self.check_out - self.check_in
+        with np.errstate(invalid='ignore'):
+            return np.where(seconds > 0, seconds, np.nan)
+
+
+def _quantile(sorted_values, starts, counts, q):
+    """Per-group quantile (linear interpolation) of values sorted within contiguous groups"""
+    result = np.zeros(len(counts))
+    has = counts > 0
+    position = starts[has] + q * (counts[has] - 1)
+    lo = np.floor(position).astype(np.int64)
+    hi = np.ceil(position).astype(np.int64)
+    result[has] = sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (position - lo)
+    return result
+
+
+def group_stats(group, values, n_groups):
+    """count/sum/mean/median/p90 of ``values`` per group index in [0, n_groups)"""
+    count = np.bincount(group, minlength=n_groups)
+    total = np.bincount(group, weights=values, minlength=n_groups)
+    mean = np.divide(total, count, out=np.zeros(n_groups), where=count > 0)
+
+    order = np.lexsort((values, group))
+    sorted_values = values[order]
+    starts = np.concatenate(([0], np.cumsum(count)[:-1]))
+    return {
+        'count': count,
+        'sum': total,
+        'mean': mean,
+        'median': _quantile(sorted_values, starts, count, 0.5),
+        'p90': _quantile(sorted_values, starts, count, 0.9),
+    }
+
+
+def status_counts(group, status, n_groups):
+    """(n_groups, len(STATUSES)) matrix of record counts per status"""
+    return np.bincount(group * len(STATUSES) + status,
+                       minlength=n_groups * len(STATUSES)).reshape(n_groups, len(STATUSES))
+
+
+def _hours(seconds):
+    return round(float(seconds) / SECONDS_PER_HOUR, 2)
+
+
+def _summary_rows(labels, stats, statuses, overtime):
+    rows = []
+    for i, label in enumerate(labels):
+        present, absent, leave = (int(statuses[i, STATUS_CODES[s]]) for s in ('present', 'absent', 'leave'))
+        recorded = present + absent + leave
+        rows.append(dict(
+            label,
+            present=present,
+            absent=absent,
+            leave=leave,
+            absence_rate=round(absent / recorded * 100, 1) if recorded else 0.0,
+            shifts=int(stats['count'][i]),
+            total_hours=_hours(stats['sum'][i]),
+            average_hours=_hours(stats['mean'][i]),
+            median_hours=_hours(stats['median'][i]),
+            p90_hours=_hours(stats['p90'][i]),
+            overtime_hours=_hours(overtime[i]),
+        ))
+    return rows
+
+
+def summarize(frame, employees, first_day, last_day, standard_shift_seconds=8 * 3600):
+    """Per-employee, per-department, daily and overall figures for ``frame``.
+
+    ``employees`` is a list of (id, full_name, username, department); rows of
+    users not in it are ignored. ``first_day``/``last_day`` are dates bounding
+    the daily series. Overtime is worked time beyond ``standard_shift_seconds``
+    in a single shift.
+    """
+    n_employees = len(employees)
+    employee_ids = np.array([e[0] for e in employees], dtype=np.int64)
+    by_id = np.argsort(employee_ids)
+
+    # Map user ids to dense employee indices; drop rows for anyone else
+    slot = np.searchsorted(employee_ids, frame.user_id, sorter=by_id)
+    slot = np.minimum(slot, max(n_employees - 1, 0))
+    group = by_id[slot] if n_employees else slot
+    known = (employee_ids[group] == frame.user_id) if n_employees else np.zeros(len(frame), dtype=bool)
+    group, status, day = group[known], frame.status[known], frame.day[known]
+    shift = frame.shift_seconds[known]
+
+    worked = ~np.isnan(shift)
+    shift_group, shift_values = group[worked], shift[worked]
+    overtime_values = np.maximum(shift_values - standard_shift_seconds, 0)
+
+    departments = [e[3] or '-' for e in employees]
+    department_names, department_of = np.unique(np.array(departments, dtype=object), return_inverse=True)
+    n_departments = len(department_names)
+
+    employee_rows = _summary_rows(
+        [{'id': e[0], 'name': e[1], 'username': e[2], 'department': departments[i]}
+         for i, e in enumerate(employees)],
+        group_stats(shift_group, shift_values, n_employees),
+        status_counts(group, status, n_employees),
+        np.bincount(shift_group, weights=overtime_values, minlength=n_employees),
+    )
+
+    shift_department = department_of[shift_group]
+    department_rows = _summary_rows(
+        [{'department': str(name), 'headcount': int(headcount)}
+         for name, headcount in zip(department_names, np.bincount(department_of, minlength=n_departments))],
+        group_stats(shift_department, shift_values, n_departments),
+        status_counts(department_of[group], status, n_departments),
+        np.bincount(shift_department, weights=overtime_values, minlength=n_departments),
+    )
+
+    overall = _summary_rows(
+        [{'headcount': n_employees}],
+        group_stats(np.zeros(len(shift_values), dtype=np.int64), shift_values, 1),
+        status_counts(np.zeros(len(status), dtype=np.int64), status, 1),
+        [overtime_values.sum()],
+    )[0]
+
+    first = int(np.datetime64(first_day, 'D').astype(np.int64))
+    n_days = int(np.datetime64(last_day, 'D').astype(np.int64)) - first + 1
+    in_range = (day >= first) & (day < first + n_days)
+    daily_status = status_counts(day[in_range] - first, status[in_range], max(n_days, 0))
+    daily_hours = np.bincount(day[worked & in_range] - first, weights=shift[worked & in_range],
+                              minlength=max(n_days, 0))
+    dates = np.arange(first, first + max(n_days, 0)).astype('datetime64[D]').astype(str)
+    daily = [{
+        'date': str(date),
+        'present': int(daily_status[i, STATUS_CODES['present']]),
+        'absent': int(daily_status[i, STATUS_CODES['absent']]),
+        'leave': int(daily_status[i, STATUS_CODES['leave']]),
+        'hours': _hours(daily_hours[i]),
+    } for i, date in enumerate(dates)]
+
+    return {
+        'employees': employee_rows,
+        'departments': department_rows,
+        'daily': daily,
+        'overall': overall,
+    }
@@ -0,0 +1,209 @@
+"""Versioned JSON read API (``/api/v1``) for employees, rotas and attendance.
+
+Every list endpoint takes the same parameters:
+
+- ``fields``: comma-separated columns to return (default: all); ``id`` is always included
+- ``id``: only these records (repeatable or comma-separated), for batch lookups
+- ``since`` / ``limit``: cursor pagination by id, as in the change feed; pass the
+  returned ``cursor`` as ``since`` while ``has_more`` is true
+
+plus filters of their own. Only the requested columns are selected, and dates
+and times are formatted by SQLite, so rows go from the cursor's tuples
+straight into JSON without loading ORM objects or parsing values in Python.
+"""
+from datetime import datetime
+from functools import wraps
+
+from flask import Blueprint, current_app, request, jsonify
+from flask_login import login_required, current_user
+
+from archive import attendance_for_range
+from models import db, User, Rota
+from read_routing import read_only
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+class InvalidParameter(ValueError):
+    """A query parameter the API can't use; answered with 400 and the message"""
+
+
+def _iso_datetime(column):
+    # Stored as 'YYYY-MM-DD HH:MM:SS.ffffff'; returned like the change feed's timestamps
+    return db.func.strftime('%Y-%m-%dT%H:%M:%S', column)
+
+
+def _iso_time(column):
+    # Stored as 'HH:MM:SS.ffffff'
+    return db.func.substr(db.type_coerce(column, db.String), 1, 8)
+
+
+def _as_string(column):
+    # Dates are stored as 'YYYY-MM-DD' already
+    return db.type_coerce(column, db.String)
+
+
+def user_fields():
+    return {
+        'id': User.id,
+        'username': User.username,
+        'email': User.email,
+        'full_name': User.full_name,
+        'role': User.role,
+        'department': User.department,
+        'is_active': User.is_active,
+        'created_at': _iso_datetime(User.created_at),
+        'site': User.site,
+    }
+
+
+def rota_fields():
+    return {
+        'id': Rota.id,
+        'user_id': Rota.user_id,
+        'day_of_week': Rota.day_of_week,
+        'shift_start': _iso_time(Rota.shift_start),
+        'shift_end': _iso_time(Rota.shift_end),
+        'is_active': Rota.is_active,
+        'site': Rota.site,
+    }
+
+
+def attendance_fields(Att):
+    return {
+        'id': Att.id,
+        'user_id': Att.user_id,
+        'date': _as_string(Att.date),
+        'status': Att.status,
+        'check_in': _iso_datetime(Att.check_in),
+        'check_out': _iso_datetime(Att.check_out),
+        'notes': Att.notes,
+        'site': Att.site,
+    }
+
+
+def _int_list(name):
+    """Integers from a parameter that may be repeated and/or comma-separated"""
+    try:
+        return [int(value) for values in request.args.getlist(name) for value in values.split(',') if value.strip()]
+    except ValueError:
+        raise InvalidParameter(f'{name} must be a list of integers')
+
+
+def _boolean(name):
+    value = request.args.get(name, '', type=str).lower()
+    if not value:
+        return None
+    if value not in ('true', 'false', '1', '0'):
+        raise InvalidParameter(f'{name} must be true or false')
+    return value in ('true', '1')
+
+
+def _date(name):
+    value = request.args.get(name, '', type=str)
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        raise InvalidParameter('Dates must be YYYY-MM-DD')
+
+
+def list_response(fields, id_column, filters=()):
+    """Run the list query for ``fields`` (name -> column) and return the page as JSON"""
+    requested = [name.strip() for name in request.args.get('fields', '', type=str).split(',') if name.strip()]
+    unknown = [name for name in requested if name not in fields]
+    if unknown:
+        raise InvalidParameter(f"Unknown fields: {', '.join(unknown)}; available: {', '.join(fields)}")
+    names = ['id'] + [name for name in (requested or fields) if name != 'id']
+
+    ids = _int_list('id')
+    max_limit = current_app.config['API_MAX_LIMIT']
+    if len(ids) > max_limit:
+        raise InvalidParameter(f'At most {max_limit} ids per request')
+    since = request.args.get('since', 0, type=int)
+    limit = max(1, min(request.args.get('limit', 100, type=int), max_limit))
+
+    query = db.select(*(fields[name].label(name) for name in names)).where(id_column > since, *filters)
+    if ids:
+        query = query.where(id_column.in_(ids))
+    rows = db.session.execute(query.order_by(id_column).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return jsonify({
+        'data': [dict(zip(names, row)) for row in rows],
+        'cursor': rows[-1][0] if rows else since,
+        'has_more': has_more,
+    })
+
+
+def api_view(view):
+    """Admin-only API view; an InvalidParameter becomes a 400 with its message"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_user.role != 'admin':
+            return jsonify({'success': False}), 403
+        try:
+            return view(*args, **kwargs)
+        except InvalidParameter as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+    return wrapper
+
+
+@bp.route('/users')
+@login_required
+@read_only
+@api_view
+def list_users():
+    """Employees and admins. Filters: role, department, active (true/false)."""
+    filters = []
+    role = request.args.get('role', '', type=str)
+    if role:
+        filters.append(User.role == role)
+    department = request.args.get('department', '', type=str).strip()
+    if department:
+        filters.append(User.department == department)
+    active = _boolean('active')
+    if active is not None:
+        filters.append(User.is_active == active)
+    return list_response(user_fields(), User.id, filters)
+
+
+@bp.route('/rotas')
+@login_required
+@read_only
+@api_view
+def list_rotas():
+    """Weekly rota entries. Filters: user_id (repeatable), day_of_week, active (true/false)."""
+    filters = []
+    user_ids = _int_list('user_id')
+    if user_ids:
+        filters.append(Rota.user_id.in_(user_ids))
+    day_of_week = request.args.get('day_of_week', '', type=str)
+    if day_of_week:
+        filters.append(Rota.day_of_week == day_of_week.capitalize())
+    active = _boolean('active')
+    if active is not None:
+        filters.append(Rota.is_active == active)
+    return list_response(rota_fields(), Rota.id, filters)
+
+
+@bp.route('/attendance')
+@login_required
+@read_only
+@api_view
+def list_attendance():
+    """Attendance records, archived years included. Filters: user_id (repeatable), date_from, date_to, status."""
+    date_from, date_to = _date('date_from'), _date('date_to')
+    Att = attendance_for_range(date_from, date_to)
+    filters = []
+    user_ids = _int_list('user_id')
+    if user_ids:
+        filters.append(Att.user_id.in_(user_ids))
+    if date_from:
+        filters.append(Att.date >= date_from)
+    if date_to:
+        filters.append(Att.date <= date_to)
+    status = request.args.get('status', '', type=str)
+    if status:
+        filters.append(Att.status == status)
+    return list_response(attendance_fields(Att), Att.id, filters)
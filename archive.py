@@ -0,0 +1,127 @@
+"""Closed years of attendance kept in one SQLite file per year.
+
+``flask archive-attendance`` moves a year's rows out of the hot table into
+its archive file; ``attendance_for_range`` attaches the archives a date
+range needs, so reports read archived and current records alike.
+"""
+import os
+from datetime import datetime
+
+from flask import current_app
+
+import sharding
+from models import db, Attendance, AttendanceArchive
+
+
+_archive_metadata = db.MetaData()
+
+
+def archive_path(year):
+    """Archive file of a year; sites other than the first keep theirs in a subdirectory"""
+    site = sharding.current_site()
+    directory = current_app.config['ARCHIVE_DIR']
+    if site != sharding.default_site():
+        directory = os.path.join(directory, site)
+    return os.path.join(directory, f'attendance_{year}.db')
+
+
+def archive_table(year):
+    """Table object for the attendance table inside the archive attached as ``archive_<year>``"""
+    schema = f'archive_{year}'
+    table = _archive_metadata.tables.get(f'{schema}.attendance')
+    if table is None:
+        # Same columns as the hot table, minus the foreign key to user which lives in another file
+        table = db.Table('attendance', _archive_metadata,
+                         *[db.Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)
+                           for c in Attendance.__table__.columns],
+                         schema=schema)
+    return table
+
+
+def attach_archive(year, create=False):
+    """Attach a year's archive file to the session connection if it isn't already"""
+    schema = f'archive_{year}'
+    connection = db.session.connection()
+    attached = {row[1] for row in connection.exec_driver_sql('PRAGMA database_list')}
+    if schema not in attached:
+        path = archive_path(year)
+        if create:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        connection.exec_driver_sql(f"ATTACH DATABASE '{path}' AS {schema}")
+    if create:
+        archive_table(year).create(bind=connection, checkfirst=True)
+        connection.exec_driver_sql(
+            f'CREATE INDEX IF NOT EXISTS {schema}.ix_attendance_user_date ON attendance (user_id, date)')
+        connection.exec_driver_sql(
+            f'CREATE INDEX IF NOT EXISTS {schema}.ix_attendance_date ON attendance (date)')
+    return schema
+
+
+def archived_years(start_date=None, end_date=None):
+    """Archived years overlapping [start_date, end_date] (either end may be open)"""
+    query = db.session.query(AttendanceArchive.year).filter(AttendanceArchive.row_count > 0)
+    if start_date:
+        query = query.filter(AttendanceArchive.year >= start_date.year)
+    if end_date:
+        query = query.filter(AttendanceArchive.year <= end_date.year)
+    return [row[0] for row in query.order_by(AttendanceArchive.year)]
+
+
+def attendance_for_range(start_date=None, end_date=None):
+    """Attendance entity to query for records between start_date and end_date.
+
+    Returns the plain Attendance model when the range only touches the hot
+    table; otherwise an alias over the hot table UNION ALL the archives that
+    overlap the range, which can be filtered and ordered like Attendance.
+    """
+    years = archived_years(start_date, end_date)
+    if not years:
+        return Attendance
+
+    selects = [db.select(*Attendance.__table__.columns)]
+    for year in years:
+        attach_archive(year)
+        selects.append(db.select(*archive_table(year).columns))
+    return db.aliased(Attendance, db.union_all(*selects).subquery('attendance_all'))
+
+
+def purge_archived_attendance(user_ids):
+    """Delete archived attendance for users that are being deleted"""
+    for year in archived_years():
+        attach_archive(year)
+        table = archive_table(year)
+        db.session.execute(db.delete(table).where(table.c.user_id.in_(user_ids)))
+
+
+def archive_attendance_year(year, batch_size=5000):
+    """Move one year's attendance rows into its archive file, batch by batch.
+
+    Each batch copies rows into the attached archive and deletes them from the
+    hot table in the same transaction, so an interrupted run loses nothing and
+    can simply be resumed.
+    """
+    first_day, last_day = datetime(year, 1, 1).date(), datetime(year, 12, 31).date()
+    archive = db.session.get(AttendanceArchive, year)
+    if archive is None:
+        archive = AttendanceArchive(year=year, path=archive_path(year), row_count=0)
+        db.session.add(archive)
+        db.session.commit()
+
+    table = archive_table(year)
+    hot = Attendance.__table__
+    moved = 0
+    while True:
+        attach_archive(year, create=True)
+        ids = [row[0] for row in db.session.execute(
+            db.select(hot.c.id).where(hot.c.date >= first_day, hot.c.date <= last_day)
+            .order_by(hot.c.id).limit(batch_size))]
+        if not ids:
+            break
+        db.session.execute(db.insert(table).from_select(
+            [c.name for c in hot.columns], db.select(*hot.columns).where(hot.c.id.in_(ids))))
+        db.session.execute(db.delete(hot).where(hot.c.id.in_(ids)))
+        archive.row_count = (archive.row_count or 0) + len(ids)
+        archive.archived_at = datetime.utcnow()
+        db.session.commit()
+        moved += len(ids)
+    return moved
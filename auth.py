@@ -0,0 +1,172 @@
+"""Sign-in, sign-out and the profile page, plus the per-request session checks every page goes through."""
+import uuid
+
+from flask import Blueprint, render_template, request, redirect, url_for, session, g
+from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+
+import sharding
+from emails import send_password_change_email
+from models import db, User
+from password_hashing import password_hasher, HashingBusy
+
+bp = Blueprint('auth', __name__)
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+
+# Generate unique server instance ID on startup
+SERVER_INSTANCE_ID = str(uuid.uuid4())
+
+
+# ===================== Login Manager =====================
+@login_manager.user_loader
+def load_user(user_id):
+    site, _, user_id = user_id.rpartition(':')
+    try:
+        sharding.use_site(site or None)
+    except ValueError:
+        return None
+    return User.query.get(int(user_id))
+
+
+# ===================== Request Handlers =====================
+@bp.before_app_request
+def check_server_instance():
+    """Check if server was restarted - logout users if instance changed"""
+    if current_user.is_authenticated and request.endpoint != 'auth.logout':
+        # Check if session has the current server instance ID
+        if 'server_instance_id' not in session or session.get('server_instance_id') != SERVER_INSTANCE_ID:
+            logout_user()
+            session.clear()
+            return redirect(url_for('auth.login'))
+
+
+# Pages that always use the signed-in admin's own site
+SITE_HOME_ENDPOINTS = {'auth.profile', 'auth.logout', 'admin.switch_site'}
+
+
+def can_switch_site(user):
+    """Only admins of the first (head office) site may look at other sites"""
+    return user.role == 'admin' and user.site == sharding.default_site()
+
+
+@bp.before_app_request
+def select_site():
+    """Scope admin pages to the site picked in the site switcher (default: the admin's own site).
+
+    With all sites selected, cross-site reports fan out to every site and
+    everything else stays on the admin's own site.
+    """
+    if not current_user.is_authenticated or request.endpoint in SITE_HOME_ENDPOINTS:
+        return
+    selected = session.get('site')
+    if not selected or selected == current_user.site or not can_switch_site(current_user):
+        return
+    if selected == sharding.ALL_SITES:
+        g.all_sites = True
+    elif selected in sharding.sites():
+        # The admin row belongs to another database; keep it out of this site's identity map
+        db.session.expunge(current_user._get_current_object())
+        sharding.use_site(selected)
+
+
+@bp.app_context_processor
+def inject_sites():
+    if not (current_user.is_authenticated and can_switch_site(current_user)) or len(sharding.sites()) < 2:
+        return {'site_choices': []}
+    return {
+        'site_choices': sharding.sites(),
+        'selected_site': sharding.ALL_SITES if sharding.all_sites_selected() else sharding.current_site(),
+    }
+
+
+# ===================== Routes =====================
+@bp.route('/')
+def index():
+    if current_user.is_authenticated:
+        if current_user.role == 'admin':
+            return redirect(url_for('admin.dashboard'))
+        else:
+            return redirect(url_for('employee.dashboard'))
+    return redirect(url_for('auth.login'))
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        sharding.use_site(sharding.locate(username_exists, username))
+        user = User.query.filter_by(username=username).first()
+
+        try:
+            valid = bool(user) and user.check_password(password)
+            # Upgrade hashes made with old cost parameters while we have the plaintext
+            if valid and user.password_needs_rehash():
+                user.set_password(password)
+                db.session.commit()
+                password_hasher.record_rehash()
+        except HashingBusy:
+            return render_template('login.html', error='The server is busy. Please try again in a moment.'), 503
+
+        if valid and user.is_active:
+            login_user(user)
+            # Store server instance ID in session
+            session['server_instance_id'] = SERVER_INSTANCE_ID
+            if user.role == 'admin':
+                return redirect(url_for('admin.dashboard'))
+            else:
+                return redirect(url_for('employee.dashboard'))
+        else:
+            return render_template('login.html', error='Invalid username or password')
+
+    return render_template('login.html')
+
+
+def username_exists(username):
+    return db.session.query(User.id).filter_by(username=username).first() is not None
+
+
+def email_exists(email):
+    return db.session.query(User.id).filter_by(email=email).first() is not None
+
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    session.pop('site', None)
+    return redirect(url_for('auth.login'))
+
+
+@bp.route('/profile', methods=['GET', 'POST'])
+@login_required
+def profile():
+    if request.method == 'POST':
+        full_name = request.form.get('full_name')
+        email = request.form.get('email')
+        password = request.form.get('password')
+        
+        current_user.full_name = full_name
+        
+        # Only update email if it's changed and not already in use
+        if email != current_user.email:
+            if User.query.filter_by(email=email).first():
+                return render_template('profile.html', error='Email already in use', user=current_user)
+            current_user.email = email
+        
+        # Only update password if provided
+        password_changed = False
+        if password:
+            current_user.set_password(password)
+            password_changed = True
+        
+        db.session.commit()
+        
+        # Send password change notification
+        if password_changed:
+            send_password_change_email(current_user)
+        
+        return render_template('profile.html', success='Profile updated successfully', user=current_user)
+    
+    return render_template('profile.html', user=current_user)
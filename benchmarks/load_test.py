@@ -0,0 +1,313 @@
+"""Shift-start surge load test for login, check-in/check-out and dashboards.
+
+Starts local WSGI worker processes serving the app against a throwaway SQLite
+database, then replays a shift boundary: every simulated employee logs in,
+loads their dashboard, checks in and (optionally) checks out, spread over a
+ramp-up window, while admin sessions keep polling the dashboard APIs.
+
+    python benchmarks/load_test.py --employees 300 --concurrency 50 --workers 4
+    python benchmarks/load_test.py --employees 300 --wal --json results.json
+
+Latency percentiles are reported per operation, along with HTTP errors,
+punches rejected by the app, and failures caused by SQLite lock contention.
+"""
+import argparse
+import http.cookiejar
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOCKED_HEADER = 'X-Load-Test-Error'
+
+
+def _configure_env(db_path, hash_method, wal):
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    # The app puts SQLite in WAL mode by default; without --wal, measure the rollback journal instead
+    os.environ['SQLITE_WAL'] = 'true' if wal else 'false'
+    if hash_method:
+        os.environ['PASSWORD_HASH_METHOD'] = hash_method
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+
+def seed(db_path, employees, hash_method, wal):
+    """Create the admin and ``employees`` employees rostered around the current time."""
+    _configure_env(db_path, hash_method, wal)
+    from app import create_app
+    from commands import create_default_admin
+    from models import db, User, Rota
+    from password_hashing import password_hasher
+
+    now = datetime.utcnow()
+    # Shift starts shortly so that check-in is allowed for the whole run
+    shift_start = (now + timedelta(minutes=10)).time()
+    shift_end = min(now + timedelta(hours=4), datetime.combine(now.date(), datetime.max.time())).time()
+
+    with create_app().app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(db.text(f"PRAGMA journal_mode = {'WAL' if wal else 'DELETE'}"))
+        create_default_admin()
+        password_hash = password_hasher.hash('emp123')
+        db.session.execute(User.__table__.insert(), [{
+            'username': f'surge{i:05d}',
+            'email': f'surge{i:05d}@example.com',
+            'password_hash': password_hash,
+            'full_name': f'Surge Employee {i}',
+            'role': 'employee',
+            'department': 'Operations',
+            'is_active': True,
+            'created_at': now,
+        } for i in range(employees)])
+        user_ids = [row[0] for row in db.session.query(User.id).filter(User.role == 'employee')]
+        db.session.execute(Rota.__table__.insert(), [{
+            'user_id': user_id,
+            'day_of_week': now.strftime('%A'),
+            'shift_start': shift_start,
+            'shift_end': shift_end,
+            'is_active': True,
+            'created_at': now,
+        } for user_id in user_ids])
+        db.session.commit()
+
+
+def serve(db_path, hash_method, wal, port, ready):
+    """Worker process: serve the app with a threaded WSGI server on ``port``."""
+    _configure_env(db_path, hash_method, wal)
+    import logging
+    from sqlalchemy.exc import OperationalError
+    from werkzeug.serving import make_server
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    @app.errorhandler(OperationalError)
+    def database_error(e):
+        db.session.rollback()
+        kind = 'database-locked' if 'locked' in str(e.orig) else 'database-error'
+        return 'Database error', 503, {LOCKED_HEADER: kind}
+
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    ready.set()
+    server.serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.locked = {}
+        self.rejected = {}
+
+    def record(self, op, seconds, status, locked=False, rejected=False):
+        with self._lock:
+            self.samples.setdefault(op, []).append(seconds)
+            if locked:
+                self.locked[op] = self.locked.get(op, 0) + 1
+            elif status >= 400 or status == 0:
+                self.errors[op] = self.errors.get(op, 0) + 1
+            if rejected:
+                self.rejected[op] = self.rejected.get(op, 0) + 1
+
+
+class Session:
+    """A browser-like client: keeps cookies, does not follow redirects."""
+
+    def __init__(self, base_url, recorder, timeout):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect())
+
+    def request(self, op, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        started = time.perf_counter()
+        status, headers, payload = 0, {}, b''
+        try:
+            with self.opener.open(self.base_url + path, data=body, timeout=self.timeout) as response:
+                status, headers, payload = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            status, headers, payload = e.code, e.headers, e.read()
+        except (urllib.error.URLError, OSError):
+            pass
+        elapsed = time.perf_counter() - started
+
+        rejected = False
+        if status == 200 and path.startswith('/employee/check-'):
+            try:
+                rejected = not json.loads(payload).get('success', False)
+            except ValueError:
+                pass
+        locked = headers.get(LOCKED_HEADER) == 'database-locked' if headers else False
+        self.recorder.record(op, elapsed, status, locked=locked, rejected=rejected)
+        return status
+
+
+def employee_flow(base_urls, index, recorder, args):
+    session = Session(random.choice(base_urls), recorder, args.timeout)
+    status = session.request('login', '/login', {'username': f'surge{index:05d}', 'password': 'emp123'})
+    if status != 302:
+        return
+    session.request('employee_dashboard', '/employee/dashboard')
+    session.request('check_in', '/employee/check-in', {})
+    if args.check_out:
+        session.request('check_out', '/employee/check-out', {})
+
+
+def admin_poller(base_urls, recorder, args, stop):
+    session = Session(random.choice(base_urls), recorder, args.timeout)
+    if session.request('admin_login', '/login', {'username': 'admin', 'password': 'admin123'}) != 302:
+        return
+    while not stop.is_set():
+        session.request('admin_stats', '/api/admin/stats')
+        session.request('admin_hours_today', '/api/admin/employee-hours-today')
+        stop.wait(args.poll_interval)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder, duration):
+    operations = {}
+    for op, samples in sorted(recorder.samples.items()):
+        ordered = sorted(samples)
+        operations[op] = {
+            'count': len(ordered),
+            'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+            'p95_ms': round(percentile(ordered, 95) * 1000, 2),
+            'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+            'max_ms': round(ordered[-1] * 1000, 2),
+            'errors': recorder.errors.get(op, 0),
+            'lock_failures': recorder.locked.get(op, 0),
+            'rejected': recorder.rejected.get(op, 0),
+        }
+    total = sum(op['count'] for op in operations.values())
+    return {
+        'duration_seconds': round(duration, 3),
+        'requests': total,
+        'throughput_rps': round(total / duration, 1) if duration else 0,
+        'operations': operations,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=300, help='Employees punching in during the surge.')
+    parser.add_argument('--concurrency', type=int, default=50, help='Concurrent employee clients.')
+    parser.add_argument('--ramp-up', type=float, default=5.0, help='Seconds over which employee arrivals are spread.')
+    parser.add_argument('--admins', type=int, default=3, help='Admin sessions polling dashboards during the surge.')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between admin dashboard polls.')
+    parser.add_argument('--workers', type=int, default=2, help='WSGI worker processes.')
+    parser.add_argument('--no-check-out', dest='check_out', action='store_false',
+                        help='Only check in; skip the check-out after it.')
+    parser.add_argument('--wal', action='store_true', help='Put the SQLite database in WAL mode.')
+    parser.add_argument('--hash-method', default='',
+                        help='Password hash method for seeded accounts (default: the app default).')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request client timeout in seconds.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for arrival times and worker choice.')
+    parser.add_argument('--json', dest='json_path', default='', help='Also write the summary as JSON to this file.')
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'load.db')
+        ctx = multiprocessing.get_context('spawn')
+
+        seeder = ctx.Process(target=seed, args=(db_path, args.employees, args.hash_method, args.wal))
+        seeder.start()
+        seeder.join()
+        if seeder.exitcode != 0:
+            print('Seeding failed', file=sys.stderr)
+            return 1
+
+        ports = [free_port() for _ in range(args.workers)]
+        workers = []
+        for port in ports:
+            ready = ctx.Event()
+            proc = ctx.Process(target=serve, args=(db_path, args.hash_method, args.wal, port, ready), daemon=True)
+            proc.start()
+            if not ready.wait(30):
+                print(f'Worker on port {port} failed to start', file=sys.stderr)
+                return 1
+            workers.append(proc)
+        base_urls = [f'http://127.0.0.1:{port}' for port in ports]
+
+        recorder = Recorder()
+        stop = threading.Event()
+        pollers = [threading.Thread(target=admin_poller, args=(base_urls, recorder, args, stop), daemon=True)
+                   for _ in range(args.admins)]
+        for t in pollers:
+            t.start()
+
+        arrivals = sorted(random.uniform(0, args.ramp_up) for _ in range(args.employees))
+        started = time.perf_counter()
+
+        def arrive(index):
+            delay = arrivals[index] - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+            employee_flow(base_urls, index, recorder, args)
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(arrive, range(args.employees)))
+        duration = time.perf_counter() - started
+
+        stop.set()
+        for t in pollers:
+            t.join(args.timeout)
+        for proc in workers:
+            proc.terminate()
+            proc.join()
+
+    summary = summarize(recorder, duration)
+    summary['config'] = {k: v for k, v in vars(args).items() if k != 'json_path'}
+
+    print(f"{summary['requests']} requests in {summary['duration_seconds']}s "
+          f"({summary['throughput_rps']} req/s), {args.workers} workers, "
+          f"{'WAL' if args.wal else 'rollback journal'}")
+    print(f"{'operation':<20} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} "
+          f"{'errors':>7} {'locked':>7} {'rejected':>8}")
+    for op, row in summary['operations'].items():
+        print(f"{op:<20} {row['count']:>6} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9} "
+              f"{row['max_ms']:>9} {row['errors']:>7} {row['lock_failures']:>7} {row['rejected']:>8}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+            f.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""Benchmarks for the report functions and Excel export routes.
+
+Each dataset size is generated with the same code as ``flask seed-load`` into
+a throwaway SQLite database, then every benchmark is timed, its SQL
+statements counted and its peak Python memory measured. Results are written
+as JSON and compared against a stored baseline.
+
+    python benchmarks/run_benchmarks.py                       # compare to baseline
+    python benchmarks/run_benchmarks.py --sizes large         # other sizes
+    python benchmarks/run_benchmarks.py --update-baseline     # record new baseline
+
+The exit status is 1 when any benchmark regressed past the thresholds.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# name: (employees, days of history)
+SIZES = {
+    'small': (100, 60),
+    'medium': (500, 120),
+    'large': (2000, 180),
+}
+
+# Fixed so that datasets, and therefore query counts, are identical between runs
+END_DATE = date(2024, 6, 30)
+REPORT_MONTH, REPORT_YEAR = END_DATE.month, END_DATE.year
+
+
+def load_app(db_path):
+    """Create the application against ``db_path`` instead of the real database."""
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    # Hash the admin password cheaply; KDF cost is not what is being measured
+    os.environ.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    return create_app()
+
+
+class QueryCounter:
+    def __init__(self, engines):
+        self.count = 0
+        from sqlalchemy import event
+        # Every bind, not just db.engine: @read_only views run on the read engine
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def build_benchmarks(client):
+    import reports
+
+    month_args = f'month={REPORT_MONTH}&year={REPORT_YEAR}'
+
+    def export(path):
+        def run():
+            response = client.get(f'{path}?{month_args}')
+            assert response.status_code == 200, f'{path} returned {response.status_code}'
+            return len(response.data)
+        return run
+
+    return {
+        'get_monthly_report': lambda: reports.get_monthly_report(REPORT_MONTH, REPORT_YEAR),
+        'get_employee_summary_report': reports.get_employee_summary_report,
+        'get_working_hours_report': lambda: reports.get_working_hours_report(REPORT_MONTH, REPORT_YEAR),
+        'get_absence_report': lambda: reports.get_absence_report(REPORT_MONTH, REPORT_YEAR),
+        'export_monthly_report': export('/admin/export/monthly-report'),
+        'export_employee_report': export('/admin/export/employee-report'),
+        'export_working_hours_report': export('/admin/export/working-hours-report'),
+        'export_absence_report': export('/admin/export/absence-report'),
+    }
+
+
+def measure(fn, counter, app, repeat):
+    from models import db
+
+    def run():
+        # Start each run with an empty identity map so ORM caching does not flatter later runs
+        db.session.remove()
+        with app.test_request_context():
+            return fn()
+
+    counter.count = 0
+    run()
+    queries = counter.count
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'wall_seconds': round(min(timings), 6),
+        'wall_seconds_median': round(sorted(timings)[len(timings) // 2], 6),
+        'queries': queries,
+        'peak_memory_bytes': peak,
+    }
+
+
+def run_size(app, counter, size, repeat, only):
+    from commands import create_default_admin, generate_load_data
+    from models import db
+
+    employees, days = SIZES[size]
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        create_default_admin()
+        counts = generate_load_data(employees=employees, days=days, end_date=END_DATE, seed=1)
+
+    client = app.test_client()
+    response = client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    assert response.status_code == 302, 'admin login failed'
+
+    results = {}
+    with app.app_context():
+        for name, fn in build_benchmarks(client).items():
+            if only and name not in only:
+                continue
+            results[name] = measure(fn, counter, app, repeat)
+            print(f"  {name:<30} {results[name]['wall_seconds'] * 1000:10.1f} ms "
+                  f"{results[name]['queries']:7d} queries {results[name]['peak_memory_bytes'] / 1e6:9.1f} MB",
+                  file=sys.stderr)
+    return {'dataset': counts, 'benchmarks': results}
+
+
+def compare(results, baseline, time_tolerance, memory_tolerance):
+    """Return a list of human-readable regressions against ``baseline``."""
+    regressions = []
+    for size, data in results['sizes'].items():
+        base_size = baseline.get('sizes', {}).get(size)
+        if not base_size:
+            continue
+        for name, current in data['benchmarks'].items():
+            base = base_size['benchmarks'].get(name)
+            if not base:
+                continue
+            label = f'{size}/{name}'
+            if current['queries'] > base['queries']:
+                regressions.append(f"{label}: queries {base['queries']} -> {current['queries']}")
+            if current['wall_seconds'] > base['wall_seconds'] * time_tolerance:
+                regressions.append(f"{label}: wall time {base['wall_seconds']:.4f}s -> {current['wall_seconds']:.4f}s")
+            if current['peak_memory_bytes'] > base['peak_memory_bytes'] * memory_tolerance:
+                regressions.append(f"{label}: peak memory {base['peak_memory_bytes']} -> {current['peak_memory_bytes']} bytes")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='small,medium',
+                        help='Comma separated dataset sizes to run (small, medium, large).')
+    parser.add_argument('--only', default='', help='Comma separated benchmark names to run.')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark; the fastest is reported.')
+    parser.add_argument('--output', default='', help='Write JSON results to this file (default: stdout).')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare against.')
+    parser.add_argument('--update-baseline', action='store_true', help='Write the results to the baseline file.')
+    parser.add_argument('--time-tolerance', type=float, default=1.5,
+                        help='Allowed wall time ratio over the baseline before flagging a regression.')
+    parser.add_argument('--memory-tolerance', type=float, default=1.25,
+                        help='Allowed peak memory ratio over the baseline before flagging a regression.')
+    args = parser.parse_args(argv)
+
+    sizes = [s for s in args.sizes.split(',') if s]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+    only = {name for name in args.only.split(',') if name}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = load_app(os.path.join(tmp, 'bench.db'))
+        from models import db
+        with app.app_context():
+            counter = QueryCounter(db.engines.values())
+
+        results = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'end_date': END_DATE.isoformat(),
+            'sizes': {},
+        }
+        for size in sizes:
+            print(f'[{size}] {SIZES[size][0]} employees x {SIZES[size][1]} days', file=sys.stderr)
+            results['sizes'][size] = run_size(app, counter, size, args.repeat, only)
+
+    payload = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+
+    if args.update_baseline:
+        # Sizes that were not run keep their previous baseline
+        merged = results
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                merged = json.load(f)
+            merged.update({k: v for k, v in results.items() if k != 'sizes'})
+            merged.setdefault('sizes', {}).update(results['sizes'])
+        with open(args.baseline, 'w') as f:
+            f.write(json.dumps(merged, indent=2, sort_keys=True) + '\n')
+        print(f'Baseline written to {args.baseline}', file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('No baseline found; run with --update-baseline to create one.', file=sys.stderr)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if regressions:
+        print('Regressions against baseline:', file=sys.stderr)
+        for line in regressions:
+            print(f'  {line}', file=sys.stderr)
+        return 1
+    print('No regressions against baseline.', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Startup benchmark: import time, app creation and first-request latency.
+
+Every run starts a fresh Python process, as a new worker would, and times
+``import app``, ``create_app()`` and the first few requests it serves: the
+login page, the admin dashboard after signing in, and the first Excel export
+(which pays for the openpyxl import that startup skips). The medians over all
+runs are written as JSON and compared against a stored baseline.
+
+    python benchmarks/startup_benchmark.py                    # compare to baseline
+    python benchmarks/startup_benchmark.py --runs 20
+    python benchmarks/startup_benchmark.py --update-baseline  # record new baseline
+
+The exit status is 1 when a timing regressed past the tolerance, or when a
+module that should only load on first use (openpyxl, numpy, flask_mail) was
+imported during startup.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_baseline.json')
+
+# Imported on first use only; loading any of them at startup is a regression
+LAZY_MODULES = ('openpyxl', 'numpy', 'flask_mail')
+
+STEPS = ('import_app', 'create_app', 'first_request', 'first_dashboard', 'first_export')
+
+
+def child(setup):
+    """Run inside a fresh interpreter: time startup and the first requests, print JSON."""
+    timings = {}
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    timings['import_app'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    app = create_app()
+    timings['create_app'] = time.perf_counter() - started
+    eager = [name for name in LAZY_MODULES if name in sys.modules]
+
+    if setup:
+        import commands
+        commands.init_db(app)
+
+    client = app.test_client()
+    for step, method, path, data in (
+            ('first_request', 'get', '/login', None),
+            ('first_dashboard', 'post', '/login', {'username': 'admin', 'password': 'admin123'}),
+            ('first_export', 'get', '/admin/export/monthly-report', None)):
+        started = time.perf_counter()
+        response = getattr(client, method)(path, data=data, follow_redirects=True)
+        timings[step] = time.perf_counter() - started
+        assert response.status_code == 200, f'{path} returned {response.status_code}'
+
+    print(json.dumps({'timings': timings, 'eager_modules': eager}))
+
+
+def run_child(env, setup=False):
+    command = [sys.executable, os.path.abspath(__file__), '--child']
+    if setup:
+        command.append('--setup')
+    started = time.perf_counter()
+    output = subprocess.run(command, env=env, cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['timings']['process'] = time.perf_counter() - started
+    return result
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """Return a list of human-readable regressions against ``baseline``."""
+    regressions = [f'{name} imported during startup' for name in results['eager_modules']]
+    for step, current in results['startup'].items():
+        base = baseline.get('startup', {}).get(step)
+        if not base:
+            continue
+        # Steps of a few milliseconds are too noisy for a ratio alone
+        if current['median'] > base['median'] * tolerance and current['median'] - base['median'] > min_delta:
+            regressions.append(f"{step}: median {base['median'] * 1000:.1f} ms -> {current['median'] * 1000:.1f} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='Fresh processes to time; medians are reported.')
+    parser.add_argument('--output', default='', help='Write JSON results to this file (default: stdout).')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare against.')
+    parser.add_argument('--update-baseline', action='store_true', help='Write the results to the baseline file.')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='Allowed median ratio over the baseline before flagging a regression.')
+    parser.add_argument('--min-delta', type=float, default=0.02,
+                        help='Ignore slowdowns smaller than this many seconds.')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--setup', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.setup)
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+                   ARCHIVE_DIR=os.path.join(tmp, 'archive'),
+                   TEMPLATE_BYTECODE_CACHE_DIR=os.path.join(tmp, 'jinja_cache'),
+                   # Hash the admin password cheaply; KDF cost is not what is being measured
+                   PASSWORD_HASH_METHOD='pbkdf2:sha256:1000')
+        # Untimed: creates the database and fills the template cache, as a deployment would
+        run_child(env, setup=True)
+        runs = []
+        for i in range(args.runs):
+            runs.append(run_child(env))
+            print(f"  run {i + 1:>3}: " + ' '.join(
+                f"{step} {runs[-1]['timings'][step] * 1000:7.1f} ms" for step in ('process', *STEPS)),
+                file=sys.stderr)
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'runs': args.runs,
+        'eager_modules': sorted({name for run in runs for name in run['eager_modules']}),
+        'startup': {step: {
+            'median': round(statistics.median(run['timings'][step] for run in runs), 6),
+            'min': round(min(run['timings'][step] for run in runs), 6),
+        } for step in ('process', *STEPS)},
+    }
+
+    payload = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            f.write(payload + '\n')
+        print(f'Baseline written to {args.baseline}', file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('No baseline found; run with --update-baseline to create one.', file=sys.stderr)
+        return 1 if results['eager_modules'] else 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.min_delta)
+    if regressions:
+        print('Regressions against baseline:', file=sys.stderr)
+        for line in regressions:
+            print(f'  {line}', file=sys.stderr)
+        return 1
+    print('No regressions against baseline.', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,569 @@
+"""Database setup and maintenance commands (``flask <command>``)."""
+from collections import Counter
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+
+import schedules
+import sharding
+from admin import canonical_department, normalize_department
+from archive import archive_path, archived_years, attach_archive, archive_attendance_year
+from ledger import rebuild_hours_ledger, verify_hours_ledger
+from models import db, User, Attendance, Rota, ShiftTemplate, CHANGE_LOG_FIELDS, record_bulk_changes
+from password_hashing import password_hasher
+from shift_templates import apply_shift_template
+
+
+def create_default_admin():
+    """Create the site's default admin user if it doesn't exist; returns its username.
+
+    The first site's admin is 'admin', other sites get 'admin_<site>'.
+    """
+    site = sharding.current_site()
+    username = 'admin' if site == sharding.default_site() else f'admin_{site}'
+    if not User.query.filter_by(username=username).first():
+        admin = User(
+            username=username,
+            email=f'{username}@attendance.com',
+            full_name='Administrator',
+            role='admin',
+            department='HR'
+        )
+        admin.set_password('admin123')
+        db.session.add(admin)
+        db.session.commit()
+    return username
+
+
+def ensure_indexes():
+    """Create model indexes missing from tables that predate them (create_all skips existing tables)"""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.session.connection(), checkfirst=True)
+
+
+def ensure_site_columns():
+    """Add the site column to tables and archives created before sites existed.
+
+    Their rows all belong to the site that owns the database, so that site
+    becomes the column default.
+    """
+    connection = db.session.connection()
+    site = sharding.current_site()
+    tables = [('main', name) for name in ('user', 'attendance', 'rota')]
+    tables += [(attach_archive(year), 'attendance') for year in archived_years()]
+    for schema, name in tables:
+        columns = {row[1] for row in connection.exec_driver_sql(f'PRAGMA {schema}.table_info("{name}")')}
+        if 'site' not in columns:
+            connection.exec_driver_sql(
+                f'ALTER TABLE {schema}."{name}" ADD COLUMN site VARCHAR(40) NOT NULL DEFAULT \'{site}\'')
+
+
+def ensure_schema():
+    """Create missing tables, columns and indexes in the current site's database"""
+    db.metadata.create_all(bind=db.session.connection())
+    ensure_site_columns()
+    ensure_indexes()
+    db.session.commit()
+
+
+MARK_ABSENCES_LEDGER_SQL = """
+INSERT INTO monthly_hours (user_id, year, month, worked_seconds, working_days, present, absent, leave, records, updated_at)
+VALUES (:user_id, :year, :month, 0, 0, 0, :absent, 0, :absent, :now)
+ON CONFLICT (user_id, year, month) DO UPDATE SET
+    absent = absent + excluded.absent,
+    records = records + excluded.records,
+    updated_at = excluded.updated_at
+"""
+
+
+def mark_absences(start_date, end_date=None):
+    """Insert 'absent' records for active employees with no attendance on a day they had a shift.
+
+    Shifts come from ``schedules.effective_shifts``, so holidays and days off
+    given by rota overrides are not marked, and override shifts are. One
+    INSERT ... SELECT covers the whole range; days an employee already has a
+    record for (or was not yet employed on) are skipped, so re-running over
+    the same range inserts nothing. Returns the number of records created.
+    """
+    end_date = end_date or start_date
+    if end_date < start_date:
+        raise ValueError('End date is before start date.')
+    if archived_years(start_date, end_date):
+        raise ValueError('Range overlaps archived years; absences can only be marked in the hot table.')
+
+    now = datetime.utcnow()
+    shifts = schedules.effective_shifts(start_date, end_date).subquery()
+    absent = db.select(
+        User.id, shifts.c.date, db.literal('absent'),
+        db.literal('Marked absent automatically: no check-in on a rostered day'),
+        db.literal(now, db.DateTime), User.site,
+    ).join(User, User.id == shifts.c.user_id).where(
+        User.role == 'employee', User.is_active == True, db.func.date(User.created_at) <= shifts.c.date,
+        ~db.exists().where(Attendance.user_id == User.id, Attendance.date == shifts.c.date),
+    )
+    attendance = Attendance.__table__
+    created = db.session.execute(attendance.insert().from_select(
+        ['user_id', 'date', 'status', 'notes', 'created_at', 'site'], absent,
+    ).returning(*(attendance.c[field] for field in CHANGE_LOG_FIELDS[Attendance]))).all()
+
+    # The bulk insert bypasses the ORM flush hooks, so log and count exactly the rows it returned
+    record_bulk_changes(Attendance, 'insert', created)
+    months = Counter((row.user_id, row.date.year, row.date.month) for row in created)
+    if months:
+        db.session.execute(db.text(MARK_ABSENCES_LEDGER_SQL), [
+            {'user_id': user_id, 'year': year, 'month': month, 'absent': count, 'now': now}
+            for (user_id, year, month), count in months.items()])
+    db.session.commit()
+    return len(created)
+
+
+@click.command('mark-absences')
+@click.option('--date', 'day', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Day to mark (default: yesterday).')
+@click.option('--from', 'date_from', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Backfill from this day (inclusive); use with --to.')
+@click.option('--to', 'date_to', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Backfill up to this day (inclusive, default: yesterday).')
+@with_appcontext
+@sharding.site_option
+def mark_absences_command(day, date_from, date_to):
+    """Record absences for rostered employees who did not check in. Safe to re-run."""
+    import time
+
+    yesterday = datetime.utcnow().date() - timedelta(days=1)
+    if day and (date_from or date_to):
+        raise click.ClickException('Use either --date or --from/--to.')
+    if date_to and not date_from:
+        raise click.ClickException('--to needs --from.')
+    if date_from:
+        start_date, end_date = date_from.date(), date_to.date() if date_to else yesterday
+    else:
+        start_date = end_date = day.date() if day else yesterday
+
+    ensure_schema()
+    started = time.perf_counter()
+    try:
+        created = mark_absences(start_date, end_date)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Marked {created} absences from {start_date} to {end_date} '
+               f'in {time.perf_counter() - started:.1f}s.')
+
+
+@click.command('normalize-departments')
+@with_appcontext
+@sharding.site_option
+def normalize_departments_command():
+    """Merge department names that differ only in spacing or case into one spelling."""
+    ensure_schema()
+    variants = {}
+    for name, count in db.session.query(User.department, db.func.count()).filter(
+            User.department.isnot(None)).group_by(User.department):
+        cleaned = normalize_department(name)
+        key = cleaned.lower() if cleaned else None
+        variants.setdefault(key, []).append((count, name, cleaned))
+
+    user = User.__table__
+    published = [user.c[field] for field in CHANGE_LOG_FIELDS[User]]
+    changed = 0
+    for key, spellings in variants.items():
+        # The most common spelling wins; blank names become NULL
+        canonical = max(spellings)[2] if key else None
+        for _, name, _ in spellings:
+            if name != canonical:
+                rows = db.session.execute(user.update().where(user.c.department == name).values(
+                    department=canonical).returning(*published)).all()
+                # The bulk update bypasses the flush hook; logging it also moves the report cache keys on
+                record_bulk_changes(User, 'update', rows)
+                changed += len(rows)
+    db.session.commit()
+    click.echo(f'Normalised {changed} employees into {len([k for k in variants if k])} departments.')
+
+
+@click.command('apply-shift-template')
+@click.argument('name')
+@click.option('--department', default=None, help='Apply to every active employee in this department.')
+@click.option('--employee', 'user_ids', type=int, multiple=True, help='Apply to this employee id (repeatable).')
+@with_appcontext
+@sharding.site_option
+def apply_shift_template_command(name, department, user_ids):
+    """Set the rotas of a department or of chosen employees to the week of shift template NAME."""
+    ensure_schema()
+    template = ShiftTemplate.query.filter_by(name=name).first()
+    if not template:
+        raise click.ClickException(f'No shift template named {name!r}.')
+    try:
+        counts = apply_shift_template(template.id, user_ids, canonical_department(department))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Applied {name!r} to {counts['employees']} employees: {counts['added']} shifts added, "
+               f"{counts['updated']} updated, {counts['removed']} removed.")
+
+
+@click.command('hours-ledger')
+@click.argument('action', type=click.Choice(['rebuild', 'verify']))
+@with_appcontext
+@sharding.site_option
+def hours_ledger_command(action):
+    """Rebuild the monthly hours ledger from attendance, or verify it matches."""
+    ensure_schema()
+    if action == 'rebuild':
+        click.echo(f'Rebuilt {rebuild_hours_ledger()} employee-months.')
+        return
+
+    mismatches = verify_hours_ledger()
+    for m in mismatches[:20]:
+        click.echo(f"user {m['user_id']} {m['year']}-{m['month']:02d}: expected {m['expected']}, ledger {m['actual']}")
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} employee-months differ; run "flask hours-ledger rebuild".')
+    click.echo('Ledger matches attendance.')
+
+
+@click.command('flush-db')
+@click.option('--force', is_flag=True, help='Do not prompt for confirmation.')
+@click.option('--keep-admin/--no-keep-admin', default=True, help='Recreate default admin after flush.')
+@with_appcontext
+@sharding.site_option
+def flush_db_command(force: bool, keep_admin: bool):
+    """Permanently delete ALL data and recreate tables.
+    By default, recreates the default admin account (admin/admin123).
+    """
+    if not force:
+        if not click.confirm('This will permanently delete ALL data. Continue?'):
+            click.echo('Aborted.')
+            return
+
+    # Drop and recreate all tables
+    db.metadata.drop_all(bind=db.session.connection())
+    db.session.commit()
+    ensure_schema()
+
+    if keep_admin:
+        create_default_admin()
+
+    click.echo('Database flushed successfully.')
+    click.echo(f"Users: {User.query.count()}, Attendance: {Attendance.query.count()}, Rotas: {Rota.query.count()}")
+
+
+@click.command('db-maintain')
+@click.option('--skip', multiple=True, type=click.Choice(['check', 'analyze', 'vacuum', 'checkpoint', 'report', 'plans']),
+              help='Leave out a step (repeatable).')
+@click.option('--full-check', is_flag=True, help='Run the slower PRAGMA integrity_check instead of quick_check.')
+@click.option('--enable-incremental-vacuum', is_flag=True,
+              help='Rebuild the file with a full VACUUM so later runs can vacuum incrementally (blocks writers).')
+@click.option('--slowest', default=5, show_default=True, help='Hot queries to show with their plans.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the results as JSON.')
+@with_appcontext
+@sharding.site_option
+def db_maintain_command(skip, full_check, enable_incremental_vacuum, slowest, as_json):
+    """Check integrity, refresh statistics, vacuum and checkpoint the database, then report its health."""
+    import json
+    import time
+    import maintenance
+
+    ensure_schema()
+    db.session.commit()
+    results = {}
+    timings = {}
+
+    def step(name, run):
+        if name in skip:
+            return
+        started = time.perf_counter()
+        results[name] = run()
+        timings[name] = round(time.perf_counter() - started, 3)
+
+    try:
+        step('check', lambda: maintenance.integrity_check(full=full_check))
+        if enable_incremental_vacuum:
+            step('enable_incremental_vacuum', maintenance.enable_incremental_vacuum)
+        step('analyze', maintenance.analyze)
+        step('vacuum', maintenance.incremental_vacuum)
+        step('checkpoint', maintenance.checkpoint_wal)
+        step('report', maintenance.database_report)
+        step('plans', lambda: maintenance.explain_hot_queries()[:slowest])
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    results['seconds'] = timings
+
+    if as_json:
+        click.echo(json.dumps(results, indent=2, default=str))
+    else:
+        echo_maintenance(results)
+    if results.get('check'):
+        raise click.ClickException(f"Integrity check found {len(results['check'])} problems.")
+
+
+def echo_maintenance(results):
+    """Human-readable ``db-maintain`` output"""
+    def size(count):
+        return '-' if count is None else f'{count / 1048576:.1f} MB'
+
+    timings = results['seconds']
+    if 'check' in results:
+        click.echo(f"Integrity: {'ok' if not results['check'] else 'FAILED'} ({timings['check']}s)")
+        for problem in results['check'][:20]:
+            click.echo(f'  {problem}')
+    if 'enable_incremental_vacuum' in results:
+        click.echo(f"Rebuilt with incremental auto-vacuum ({timings['enable_incremental_vacuum']}s)")
+    if 'analyze' in results:
+        click.echo(f"Statistics refreshed ({timings['analyze']}s)")
+    if 'vacuum' in results:
+        click.echo('Incremental vacuum: not enabled (run once with --enable-incremental-vacuum)'
+                   if results['vacuum'] is None else
+                   f"Incremental vacuum: {results['vacuum']} pages freed ({timings['vacuum']}s)")
+    if 'checkpoint' in results:
+        checkpoint = results['checkpoint']
+        click.echo('WAL checkpoint: not in WAL mode' if checkpoint is None else
+                   f'WAL checkpoint: {checkpoint[2]} of {checkpoint[1]} pages copied'
+                   + (', blocked by a reader' if checkpoint[0] else ''))
+
+    report = results.get('report')
+    if report:
+        click.echo(f"\nDatabase {report['path']}: {size(report['file_bytes'])}, WAL {size(report['wal_bytes'])}, "
+                   f"{report['journal_mode']} journal, auto-vacuum {report['auto_vacuum']}")
+        click.echo(f"  {report['free_pages']} of {report['page_count']} pages free ({report['free_ratio']:.1%}), "
+                   f"statistics {'present' if report['analyzed'] else 'missing'}")
+        click.echo(f"  {'object':<40} {'type':<6} {'size':>10} {'unused':>7} {'rows':>10}")
+        for entry in report['objects']:
+            unused = f"{entry['unused_ratio']:.0%}" if 'unused_ratio' in entry else '-'
+            rows = entry.get('rows', '')
+            click.echo(f"  {entry['name'][:40]:<40} {entry['type']:<6} {size(entry.get('bytes')):>10} "
+                       f"{unused:>7} {rows:>10}")
+
+    if results.get('plans'):
+        click.echo('\nSlowest hot queries:')
+        for plan in results['plans']:
+            scans = f" - full scan of {', '.join(plan['full_scans'])}" if plan['full_scans'] else ''
+            click.echo(f"  {plan['seconds'] * 1000:8.1f} ms  {plan['name']} ({plan['statements']} statements){scans}")
+            for line in plan['plan']:
+                click.echo(f'               {line}')
+
+
+@click.command('archive-attendance')
+@click.option('--before', 'before_year', type=int, default=None,
+              help='Archive every year before this one (default: the current year).')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows moved per transaction.')
+@with_appcontext
+@sharding.site_option
+def archive_attendance_command(before_year, batch_size):
+    """Move attendance for closed years out of the hot table into per-year archive files."""
+    current_year = datetime.utcnow().year
+    before_year = before_year or current_year
+    if before_year > current_year:
+        raise click.ClickException('Only closed years can be archived.')
+
+    ensure_schema()
+    years = [row[0] for row in db.session.query(
+        db.func.distinct(db.func.strftime('%Y', Attendance.date))).filter(
+        Attendance.date < datetime(before_year, 1, 1).date())]
+    if not years:
+        click.echo('Nothing to archive.')
+        return
+
+    for year in sorted(int(y) for y in years):
+        moved = archive_attendance_year(year, batch_size=batch_size)
+        click.echo(f'{year}: moved {moved} records to {archive_path(year)}')
+    click.echo(f'Hot attendance table now holds {Attendance.query.count()} records.')
+
+
+SEED_DEPARTMENTS = ['Operations', 'Warehouse', 'Customer Service', 'Sales', 'Finance', 'HR', 'IT', 'Logistics']
+
+# Weekly shift patterns used by seed-load: (working days, shift start, shift end)
+SEED_SHIFT_PATTERNS = [
+    (['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'], '09:00', '17:00'),
+    (['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'], '08:00', '16:00'),
+    (['Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday'], '10:00', '18:00'),
+    (['Monday', 'Wednesday', 'Friday', 'Saturday', 'Sunday'], '14:00', '22:00'),
+    (['Saturday', 'Sunday'], '07:00', '19:00'),
+]
+
+
+SEED_ATTENDANCE_SQL = """
+WITH RECURSIVE days(d, jd) AS (
+    SELECT :start_date, julianday(:start_date)
+    UNION ALL
+    SELECT date(d, '+1 day'), jd + 1 FROM days WHERE d < :end_date
+),
+shifts AS (
+    SELECT user_id, day_of_week,
+           substr(shift_start, 1, 2) * 3600 + substr(shift_start, 4, 2) * 60 AS start_s,
+           substr(shift_end, 1, 2) * 3600 + substr(shift_end, 4, 2) * 60 AS end_s
+    FROM rota
+    WHERE user_id BETWEEN :first_id AND :last_id
+),
+slots AS (
+    SELECT s.user_id, days.d, days.jd, s.start_s,
+           s.end_s + CASE WHEN s.end_s <= s.start_s THEN 86400 ELSE 0 END AS end_s,
+           1 + (s.user_id * 7919 + CAST(days.jd AS INTEGER) * 104729 + :seed * 15485863) % 2147483646 AS x
+    FROM days
+    JOIN shifts s ON s.day_of_week = CASE CAST(strftime('%w', days.d) AS INTEGER)
+        WHEN 0 THEN 'Sunday' WHEN 1 THEN 'Monday' WHEN 2 THEN 'Tuesday' WHEN 3 THEN 'Wednesday'
+        WHEN 4 THEN 'Thursday' WHEN 5 THEN 'Friday' ELSE 'Saturday' END
+),
+rolls AS (
+    -- Park-Miller style mixes of x give a uniform status roll and two
+    -- approximately normal jitters (sum of three uniforms)
+    SELECT user_id, d, jd, start_s, end_s,
+           (x * 48271 % 2147483647) / 2147483647.0 AS status_roll,
+           ((x * 16807 % 2147483647) + (x * 69621 % 2147483647) + (x * 39373 % 2147483647))
+               / 2147483647.0 - 1.5 AS in_noise,
+           ((x * 40692 % 2147483647) + (x * 40014 % 2147483647) + (x * 53668 % 2147483647))
+               / 2147483647.0 - 1.5 AS out_noise
+    FROM slots
+)
+INSERT INTO attendance (user_id, date, check_in, check_out, status, notes, created_at, site)
+SELECT user_id, d,
+       CASE WHEN status_roll < :present_cut
+            THEN datetime(jd + (start_s + in_noise * 2 * :jitter_seconds) / 86400.0) END,
+       CASE WHEN status_roll < :present_cut
+            THEN datetime(jd + (end_s + out_noise * 2 * :jitter_seconds) / 86400.0) END,
+       CASE WHEN status_roll < :present_cut THEN 'present' WHEN status_roll < :absent_cut THEN 'absent' ELSE 'leave' END,
+       CASE WHEN status_roll >= :absent_cut THEN 'Annual leave' END,
+       :created_at, :site
+FROM rolls
+"""
+
+
+def _prefix_in_use(prefix):
+    return db.session.query(User.id).filter(User.username.startswith(prefix, autoescape=True)).first() is not None
+
+
+def generate_load_data(employees=1000, days=90, present_ratio=0.9, absent_ratio=0.05, leave_ratio=0.05,
+                       jitter_minutes=10, end_date=None, prefix='load', password='emp123', seed=0,
+                       batch_size=50000):
+    """Bulk insert synthetic employees, rotas and attendance history.
+
+    Attendance is generated for the ``days`` days ending at ``end_date``
+    (default: yesterday) on each employee's rota days only. Users and rotas
+    go in with batched executemany inserts; attendance is produced inside
+    SQLite by a single INSERT ... SELECT over the rota table, with a
+    deterministic hash of (user, day, seed) standing in for randomness, so
+    the same arguments always produce the same dataset.
+    """
+    import random
+
+    rng = random.Random(seed)
+    total_ratio = present_ratio + absent_ratio + leave_ratio
+    if total_ratio <= 0:
+        raise ValueError('At least one of the present/absent/leave ratios must be positive')
+    present_cut = present_ratio / total_ratio
+    absent_cut = present_cut + absent_ratio / total_ratio
+
+    if sharding.any_site(_prefix_in_use, prefix):
+        raise ValueError(f"Users with prefix '{prefix}' already exist; use another --prefix or flush the database")
+
+    end_date = end_date or datetime.utcnow().date() - timedelta(days=1)
+    start_date = end_date - timedelta(days=days - 1)
+    now = datetime.utcnow()
+
+    # One KDF run shared by every generated account keeps seeding fast
+    password_hash = password_hasher.hash(password)
+
+    # Skip fsyncs for the duration of the load
+    db.session.execute(db.text('PRAGMA synchronous = OFF'))
+
+    width = len(str(employees))
+    user_rows = [{
+        'username': f'{prefix}{i:0{width}d}',
+        'email': f'{prefix}{i:0{width}d}@example.com',
+        'password_hash': password_hash,
+        'full_name': f'Load Employee {i}',
+        'role': 'employee',
+        'department': rng.choice(SEED_DEPARTMENTS),
+        'is_active': rng.random() > 0.02,
+        'created_at': now,
+    } for i in range(1, employees + 1)]
+    for i in range(0, len(user_rows), batch_size):
+        db.session.execute(User.__table__.insert(), user_rows[i:i + batch_size])
+
+    user_ids = [row[0] for row in db.session.query(User.id).filter(
+        User.username.startswith(prefix, autoescape=True)).order_by(User.id)]
+    if not user_ids:
+        return {'users': 0, 'rotas': 0, 'attendance': 0}
+
+    rota_rows = []
+    for user_id in user_ids:
+        working_days, start, end = rng.choice(SEED_SHIFT_PATTERNS)
+        for day in working_days:
+            rota_rows.append({
+                'user_id': user_id,
+                'day_of_week': day,
+                'shift_start': datetime.strptime(start, '%H:%M').time(),
+                'shift_end': datetime.strptime(end, '%H:%M').time(),
+                'is_active': True,
+                'created_at': now,
+            })
+    for i in range(0, len(rota_rows), batch_size):
+        db.session.execute(Rota.__table__.insert(), rota_rows[i:i + batch_size])
+
+    db.session.execute(db.text(SEED_ATTENDANCE_SQL), {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'first_id': user_ids[0],
+        'last_id': user_ids[-1],
+        'seed': seed % 1000003,
+        'jitter_seconds': int(jitter_minutes * 60),
+        'present_cut': present_cut,
+        'absent_cut': absent_cut,
+        'created_at': str(now),
+        'site': sharding.current_site(),
+    })
+
+    attendance_count = db.session.query(db.func.count(Attendance.id)).filter(
+        Attendance.user_id.between(user_ids[0], user_ids[-1])).scalar()
+
+    db.session.commit()
+    rebuild_hours_ledger(user_ids[0], user_ids[-1])
+    return {'users': len(user_ids), 'rotas': len(rota_rows), 'attendance': attendance_count}
+
+
+@click.command('seed-load')
+@click.option('--employees', default=1000, show_default=True, help='Number of employees to create.')
+@click.option('--days', default=90, show_default=True, help='Days of attendance history to generate.')
+@click.option('--present', 'present_ratio', default=0.9, show_default=True, help='Share of rota days marked present.')
+@click.option('--absent', 'absent_ratio', default=0.05, show_default=True, help='Share of rota days marked absent.')
+@click.option('--leave', 'leave_ratio', default=0.05, show_default=True, help='Share of rota days marked leave.')
+@click.option('--jitter', 'jitter_minutes', default=10, show_default=True,
+              help='Standard deviation of check-in/check-out times around the shift, in minutes.')
+@click.option('--end-date', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Last day of generated history (default: yesterday).')
+@click.option('--prefix', default='load', show_default=True, help='Username prefix for generated employees.')
+@click.option('--password', default='emp123', show_default=True, help='Password for every generated employee.')
+@click.option('--seed', type=int, default=0, show_default=True, help='Seed; the same seed and options give the same dataset.')
+@with_appcontext
+@sharding.site_option
+def seed_load_command(employees, days, present_ratio, absent_ratio, leave_ratio, jitter_minutes,
+                      end_date, prefix, password, seed):
+    """Generate synthetic employees, rotas and attendance for scale testing."""
+    import time
+
+    ensure_schema()
+    started = time.perf_counter()
+    try:
+        counts = generate_load_data(
+            employees=employees, days=days, present_ratio=present_ratio, absent_ratio=absent_ratio,
+            leave_ratio=leave_ratio, jitter_minutes=jitter_minutes,
+            end_date=end_date.date() if end_date else None, prefix=prefix, password=password, seed=seed)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f"Generated {counts['users']} employees, {counts['rotas']} rotas and "
+               f"{counts['attendance']} attendance records in {time.perf_counter() - started:.1f}s.")
+
+
+def init_db(app):
+    for site in sharding.sites(app):
+        with sharding.site_context(app, site):
+            ensure_schema()
+            username = create_default_admin()
+            print(f"Ensured default admin exists for site {site} ({username}/admin123)")
+
+
+def init_app(app):
+    for command in (mark_absences_command, normalize_departments_command, apply_shift_template_command,
+                    hours_ledger_command, flush_db_command, db_maintain_command, archive_attendance_command,
+                    seed_load_command):
+        app.cli.add_command(command)
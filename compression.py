@@ -0,0 +1,63 @@
+"""gzip/brotli compression of HTML, JSON and CSV responses.
+
+Responses of a compressible type and at least ``COMPRESS_MIN_SIZE`` bytes
+are compressed after the view returns, using the best encoding the client
+accepts (brotli when the optional ``brotli`` package is installed, else
+gzip). Streamed responses, files sent with ``send_file`` and responses that
+already carry a Content-Encoding are left alone.
+"""
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+# Preferred first when the client rates several encodings equally
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def compress(data, encoding, level):
+    """``data`` compressed with ``encoding`` ('br' quality or 'gzip' level ``level``)"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def negotiate(offered=ENCODINGS):
+    """Encoding from ``offered`` that the request accepts with the highest quality, or None"""
+    return request.accept_encodings.best_match(offered)
+
+
+def init_app(app):
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_MIMETYPES', ('text/html', 'application/json', 'text/csv'))
+    app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BROTLI_QUALITY', 5)
+
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in app.config['COMPRESS_MIMETYPES']):
+            return response
+        # Varies on Accept-Encoding even when this client gets it uncompressed
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+        encoding = negotiate()
+        if encoding is None:
+            return response
+        level = app.config['COMPRESS_BROTLI_QUALITY' if encoding == 'br' else 'COMPRESS_GZIP_LEVEL']
+        response.set_data(compress(data, encoding, level))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f'{etag}-{encoding}', weak)
+        return response
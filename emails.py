@@ -0,0 +1,151 @@
+"""Account emails sent to employees.
+
+flask_mail is imported and set up on the first email sent rather than at
+startup, so processes that never send mail don't pay for it.
+"""
+from datetime import datetime
+
+from flask import current_app
+
+
+def send_mail(subject, recipients, html):
+    from flask_mail import Mail, Message
+
+    state = current_app.extensions.get('mail') or Mail().init_app(current_app)
+    state.send(Message(subject=subject, recipients=recipients, html=html))
+
+
+def send_welcome_email(user, password):
+    """Send welcome email to newly created employee"""
+    try:
+        subject = f"Welcome to D Attendance System - Your Account Details"
+        html_body = f"""
+        <html>
+            <head>
+                <style>
+                    body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                    .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                    .header {{ background: linear-gradient(135deg, #667EEA 0%, #764BA2 100%); color: white; padding: 20px; border-radius: 8px 8px 0 0; text-align: center; }}
+                    .content {{ background: #f9f9f9; padding: 20px; border-radius: 0 0 8px 8px; border: 1px solid #ddd; }}
+                    .info-box {{ background: white; padding: 15px; margin: 15px 0; border-left: 4px solid #667EEA; border-radius: 4px; }}
+                    .credentials {{ background: #e8f4f8; padding: 15px; border-radius: 4px; margin: 15px 0; }}
+                    .credentials p {{ margin: 8px 0; font-family: monospace; }}
+                    .footer {{ text-align: center; margin-top: 20px; font-size: 12px; color: #999; }}
+                    .button {{ display: inline-block; background: #667EEA; color: white; padding: 10px 20px; border-radius: 4px; text-decoration: none; margin: 15px 0; }}
+                </style>
+            </head>
+            <body>
+                <div class="container">
+                    <div class="header">
+                        <h1>Welcome to D Attendance System! 👋</h1>
+                    </div>
+                    <div class="content">
+                        <p>Hello <strong>{user.full_name}</strong>,</p>
+                        
+                        <p>Your employee account has been successfully created in the D Attendance System. Your administrator has provided you with the credentials below to get started.</p>
+                        
+                        <div class="info-box">
+                            <h3>🔐 Your Login Credentials</h3>
+                            <div class="credentials">
+                                <p><strong>Username:</strong> <code>{user.username}</code></p>
+                                <p><strong>Password:</strong> <code>{password}</code></p>
+                                <p><strong>Email:</strong> <code>{user.email}</code></p>
+                            </div>
+                        </div>
+                        
+                        <div class="info-box">
+                            <h3>ℹ️ Important Information</h3>
+                            <ul>
+                                <li><strong>Change Your Password:</strong> Please change your password on first login by going to your Profile settings.</li>
+                                <li><strong>Keep Credentials Safe:</strong> Never share your login credentials with anyone.</li>
+                                <li><strong>System Features:</strong> You can check your attendance, view rotas, and submit records using this system.</li>
+                            </ul>
+                        </div>
+                        
+                        <p style="text-align: center; margin-top: 30px;">
+                            <a href="#" class="button">Login to System</a>
+                        </p>
+                        
+                        <p>If you have any questions or issues logging in, please contact your administrator.</p>
+                        
+                        <p>Best regards,<br><strong>D Attendance System</strong></p>
+                    </div>
+                    <div class="footer">
+                        <p>This is an automated message. Please do not reply to this email.</p>
+                    </div>
+                </div>
+            </body>
+        </html>
+        """
+        
+        send_mail(subject, [user.email], html_body)
+        return True
+    except Exception as e:
+        print(f"Failed to send email to {user.email}: {str(e)}")
+        return False
+
+
+def send_password_change_email(user):
+    """Send notification email when password is changed"""
+    try:
+        subject = f"Password Changed - D Attendance System"
+        html_body = f"""
+        <html>
+            <head>
+                <style>
+                    body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                    .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                    .header {{ background: linear-gradient(135deg, #667EEA 0%, #764BA2 100%); color: white; padding: 20px; border-radius: 8px 8px 0 0; text-align: center; }}
+                    .content {{ background: #f9f9f9; padding: 20px; border-radius: 0 0 8px 8px; border: 1px solid #ddd; }}
+                    .info-box {{ background: white; padding: 15px; margin: 15px 0; border-left: 4px solid #667EEA; border-radius: 4px; }}
+                    .alert-box {{ background: #fff3cd; padding: 15px; border-left: 4px solid #ffc107; border-radius: 4px; margin: 15px 0; }}
+                    .footer {{ text-align: center; margin-top: 20px; font-size: 12px; color: #999; }}
+                </style>
+            </head>
+            <body>
+                <div class="container">
+                    <div class="header">
+                        <h1>Password Changed Successfully 🔐</h1>
+                    </div>
+                    <div class="content">
+                        <p>Hello <strong>{user.full_name}</strong>,</p>
+                        
+                        <p>This email confirms that your password for the D Attendance System has been successfully changed.</p>
+                        
+                        <div class="info-box">
+                            <h3>📋 Change Details</h3>
+                            <p><strong>Account:</strong> {user.username}</p>
+                            <p><strong>Email:</strong> {user.email}</p>
+                            <p><strong>Date & Time:</strong> {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
+                        </div>
+                        
+                        <div class="alert-box">
+                            <h3>⚠️ Didn't make this change?</h3>
+                            <p>If you did not request this password change, please contact your system administrator immediately to secure your account.</p>
+                        </div>
+                        
+                        <div class="info-box">
+                            <h3>💡 Security Tips</h3>
+                            <ul>
+                                <li>Use a strong, unique password</li>
+                                <li>Never share your password with anyone</li>
+                                <li>Change your password regularly</li>
+                                <li>Log out from shared computers</li>
+                            </ul>
+                        </div>
+                        
+                        <p>Best regards,<br><strong>D Attendance System</strong></p>
+                    </div>
+                    <div class="footer">
+                        <p>This is an automated security notification. Please do not reply to this email.</p>
+                    </div>
+                </div>
+            </body>
+        </html>
+        """
+        
+        send_mail(subject, [user.email], html_body)
+        return True
+    except Exception as e:
+        print(f"Failed to send email to {user.email}: {str(e)}")
+        return False
@@ -0,0 +1,224 @@
+"""Employee pages: dashboard, check-in/check-out and own attendance records."""
+import functools
+import json
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, render_template, request, redirect, url_for, jsonify
+from flask_login import login_required, current_user
+
+import metrics
+import schedules
+import sharding
+from models import db, User, Attendance, ChangeLog
+from read_routing import read_only
+from template_cache import FragmentCache
+
+bp = Blueprint('employee', __name__)
+
+# Dashboard states by (site, user, day, change version): a punch or rota edit logs a change, which means a new key
+dashboard_states = FragmentCache()
+
+
+@bp.record_once
+def configure_dashboard_states(state):
+    dashboard_states.max_entries = state.app.config.setdefault('DASHBOARD_STATE_CACHE_SIZE', 4096)
+    dashboard_states.timeout = state.app.config.setdefault('DASHBOARD_STATE_CACHE_TIMEOUT', 3600)
+
+
+@functools.cache
+def _dashboard_state_statement():
+    # Built once: constructing the statement costs more than running it
+    week = schedules.effective_shifts(date.min, date.min, []).subquery('week')
+    week_shifts = db.select(db.func.json_group_array(
+        db.func.json_array(week.c.date, week.c.shift_start, week.c.shift_end))).scalar_subquery()
+    return db.select(Attendance.status, Attendance.check_in, Attendance.check_out, week_shifts).select_from(
+        User).outerjoin(Attendance, db.and_(Attendance.user_id == User.id,
+                                            Attendance.date == db.bindparam('today', type_=db.Date))).where(
+        User.id == db.bindparam('user_id'))
+
+
+@functools.cache
+def _dashboard_state_version_statement():
+    user_id = db.bindparam('user_id')
+    # Two-argument max() is NULL if either is, hence the coalesce
+    return db.select(db.func.max(
+        db.func.coalesce(db.select(db.func.max(ChangeLog.id)).where(
+            ChangeLog.user_id == user_id,
+            ChangeLog.entity.in_(('attendance', 'rota', 'rota_override'))).scalar_subquery(), 0),
+        db.func.coalesce(db.select(db.func.max(ChangeLog.id)).where(
+            ChangeLog.entity == 'holiday').scalar_subquery(), 0),
+    ))
+
+
+def dashboard_state_version(user_id):
+    """Id of the latest logged change to the employee's attendance, rota or overrides, or to holidays"""
+    return db.session.execute(_dashboard_state_version_statement(), {'user_id': user_id}).scalar()
+
+
+def dashboard_state(user_id):
+    """Today's attendance, today's shift and this week's shifts of an employee, as JSON-ready data.
+
+    Everything comes from one query, and the result is cached until the
+    employee's next logged change (a punch, a rota or override edit, a new
+    holiday) or the next day.
+    """
+    today = datetime.utcnow().date()
+    key = (sharding.current_site(), user_id, today, dashboard_state_version(user_id))
+    state = dashboard_states.get(key)
+    if state is not None:
+        return state
+
+    monday = today - timedelta(days=today.weekday())
+    status, check_in, check_out, week_shifts = db.session.execute(_dashboard_state_statement(), {
+        'user_id': user_id, 'today': today, 'user_ids': [user_id],
+        'start_date': monday.isoformat(), 'end_date': (monday + timedelta(days=6)).isoformat(),
+    }).one()
+
+    # Times come back as stored, 'HH:MM:SS.ffffff'
+    shifts = {day: (start[:5], end[:5]) for day, start, end in json.loads(week_shifts)}
+    week = []
+    for offset in range(7):
+        day = (monday + timedelta(days=offset)).isoformat()
+        start, end = shifts.get(day, (None, None))
+        week.append({'date': day, 'day': schedules.WEEKDAYS[(offset + 1) % 7], 'start': start, 'end': end})
+    shift = shifts.get(today.isoformat())
+
+    state = {
+        'date': today.isoformat(),
+        'status': status,
+        'check_in': check_in.strftime('%H:%M:%S') if check_in else None,
+        'check_out': check_out.strftime('%H:%M:%S') if check_out else None,
+        'shift': {'start': shift[0], 'end': shift[1]} if shift else None,
+        'week': week,
+    }
+    dashboard_states.set(key, state)
+    return state
+
+
+@bp.route('/employee/dashboard')
+@login_required
+@read_only
+def dashboard():
+    if current_user.role != 'employee':
+        return redirect(url_for('auth.index'))
+
+    return render_template('employee_dashboard.html', state=dashboard_state(current_user.id))
+
+
+@bp.route('/api/employee/dashboard-state')
+@login_required
+@read_only
+def get_dashboard_state():
+    """The dashboard's state as JSON; the page refreshes itself from this instead of reloading"""
+    if current_user.role != 'employee':
+        return jsonify({'success': False}), 403
+
+    response = jsonify(dashboard_state(current_user.id))
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@bp.route('/employee/check-in', methods=['POST'])
+@login_required
+def check_in():
+    if current_user.role != 'employee':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+
+    now = datetime.utcnow()
+    today = now.date()
+    current_time = now.time()
+    current_day = now.strftime('%A')
+    
+    # Check if employee has a shift today (weekly rota with overrides and holidays applied)
+    rota = schedules.shift_for(current_user.id, today)
+    
+    if not rota:
+        metrics.record_punch('check_in', 'no_rota')
+        return jsonify({'success': False, 'message': f'No schedule assigned for {current_day}. Please contact admin.'})
+    
+    # Check if current time is within the allowed shift time (30 minutes before shift start)
+    shift_start = rota.shift_start
+    early_check_in = (datetime.combine(today, shift_start) - timedelta(minutes=30)).time()
+    shift_end = rota.shift_end
+    
+    if current_time < early_check_in:
+        metrics.record_punch('check_in', 'too_early')
+        return jsonify({'success': False, 'message': f'Too early to check in. Your shift starts at {shift_start.strftime("%H:%M")}. You can check in 30 minutes before.'})
+    
+    if current_time > shift_end:
+        metrics.record_punch('check_in', 'after_shift_end')
+        return jsonify({'success': False, 'message': f'Your shift ended at {shift_end.strftime("%H:%M")}. Cannot check in after shift end.'})
+    
+    existing = Attendance.query.filter_by(
+        user_id=current_user.id,
+        date=today
+    ).first()
+
+    if existing:
+        # Check if shift times have changed - if both check_in and check_out exist but shift times don't match
+        if existing.check_in and existing.check_out:
+            # Employee has completed a previous shift, but there's a new shift assigned
+            # Allow them to check in for the new shift by resetting the attendance
+            existing.check_in = now
+            existing.check_out = None
+            existing.status = 'present'
+        elif existing.check_in:
+            metrics.record_punch('check_in', 'already_checked_in')
+            return jsonify({'success': False, 'message': 'Already checked in today'})
+        else:
+            existing.check_in = now
+            existing.status = 'present'
+    else:
+        attendance = Attendance(
+            user_id=current_user.id,
+            date=today,
+            check_in=now,
+            status='present'
+        )
+        db.session.add(attendance)
+
+    db.session.commit()
+    metrics.record_punch('check_in')
+    return jsonify({'success': True, 'message': 'Check-in successful', 'time': now.strftime('%H:%M:%S'),
+                    'state': dashboard_state(current_user.id)})
+
+
+@bp.route('/employee/check-out', methods=['POST'])
+@login_required
+def check_out():
+    if current_user.role != 'employee':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+
+    today = datetime.utcnow().date()
+    attendance = Attendance.query.filter_by(
+        user_id=current_user.id,
+        date=today
+    ).first()
+
+    if not attendance:
+        metrics.record_punch('check_out', 'no_check_in')
+        return jsonify({'success': False, 'message': 'No check-in record found'})
+
+    if attendance.check_out:
+        metrics.record_punch('check_out', 'already_checked_out')
+        return jsonify({'success': False, 'message': 'Already checked out today'})
+
+    attendance.check_out = datetime.utcnow()
+    db.session.commit()
+    metrics.record_punch('check_out')
+    return jsonify({'success': True, 'message': 'Check-out successful', 'time': datetime.utcnow().strftime('%H:%M:%S'),
+                    'state': dashboard_state(current_user.id)})
+
+
+@bp.route('/employee/my-records')
+@login_required
+def my_records():
+    if current_user.role != 'employee':
+        return redirect(url_for('auth.index'))
+    
+    page = request.args.get('page', 1, type=int)
+    records = Attendance.query.filter_by(user_id=current_user.id).order_by(
+        Attendance.date.desc()
+    ).paginate(page=page, per_page=10)
+    
+    return render_template('my_records.html', records=records)
@@ -0,0 +1,456 @@
+"""Excel report downloads and the streamed raw attendance extract.
+
+openpyxl is imported by each Excel export when it runs rather than at
+startup; it is the slowest import in the app and most requests never need it.
+"""
+import csv
+import json
+import zlib
+from datetime import datetime
+from io import BytesIO, StringIO
+
+from flask import Blueprint, current_app, request, redirect, url_for, jsonify, send_file, Response, stream_with_context
+from flask_login import login_required, current_user
+
+import metrics
+from archive import attendance_for_range
+from models import db, User
+from read_routing import read_only
+from reports import (get_monthly_report, get_employee_summary_report, get_working_hours_report, get_absence_report,
+                     get_compliance_report, compliance_incidents, report_date_range)
+
+bp = Blueprint('export', __name__)
+
+
+@bp.route('/admin/export/monthly-report')
+@login_required
+@metrics.timed(metrics.EXPORT_DURATION, 'monthly_report')
+@read_only
+def monthly_report():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+    
+    month = request.args.get('month', datetime.utcnow().month, type=int)
+    year = request.args.get('year', datetime.utcnow().year, type=int)
+    
+    report_data = get_monthly_report(month, year)
+    
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Monthly Report"
+    
+    # Header
+    ws['A1'] = f"Monthly Attendance Report - {['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December'][month-1]} {year}"
+    ws['A1'].font = Font(bold=True, size=14)
+    ws.merge_cells('A1:E1')
+    
+    # Summary Section
+    ws['A3'] = "Summary"
+    ws['A3'].font = Font(bold=True, size=12)
+    
+    summary_data = [
+        ['Metric', 'Count'],
+        ['Total Present', report_data['summary']['total_present']],
+        ['Total Absent', report_data['summary']['total_absent']],
+        ['Total Leave', report_data['summary']['total_leave']],
+        ['Total Records', report_data['summary']['total_records']],
+    ]
+    
+    for row_idx, row_data in enumerate(summary_data, start=4):
+        for col_idx, value in enumerate(row_data, start=1):
+            cell = ws.cell(row=row_idx, column=col_idx, value=value)
+            if row_idx == 4:
+                cell.font = Font(bold=True)
+                cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+                cell.font = Font(bold=True, color="FFFFFF")
+    
+    # Daily Breakdown
+    ws['A10'] = "Daily Breakdown"
+    ws['A10'].font = Font(bold=True, size=12)
+    
+    daily_headers = ['Date', 'Day', 'Present', 'Absent', 'Leave']
+    for col_idx, header in enumerate(daily_headers, start=1):
+        cell = ws.cell(row=11, column=col_idx, value=header)
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    
+    for row_idx, (date, stats) in enumerate(report_data['daily_stats'].items(), start=12):
+        date_obj = datetime.strptime(date, '%Y-%m-%d').date()
+        day_name = date_obj.strftime('%A')
+        ws.cell(row=row_idx, column=1, value=date)
+        ws.cell(row=row_idx, column=2, value=day_name)
+        ws.cell(row=row_idx, column=3, value=stats['present'])
+        ws.cell(row=row_idx, column=4, value=stats['absent'])
+        ws.cell(row=row_idx, column=5, value=stats['leave'])
+    
+    ws.column_dimensions['A'].width = 15
+    ws.column_dimensions['B'].width = 15
+    ws.column_dimensions['C'].width = 12
+    ws.column_dimensions['D'].width = 12
+    ws.column_dimensions['E'].width = 12
+    
+    output = BytesIO()
+    wb.save(output)
+    output.seek(0)
+    
+    return send_file(output, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 
+                     as_attachment=True, download_name=f'Monthly_Report_{month}_{year}.xlsx')
+
+
+@bp.route('/admin/export/employee-report')
+@login_required
+@metrics.timed(metrics.EXPORT_DURATION, 'employee_report')
+@read_only
+def employee_report():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+    
+    report_data = get_employee_summary_report()
+    
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Employee Summary"
+    
+    # Header
+    ws['A1'] = "Employee Attendance Summary Report (All Time)"
+    ws['A1'].font = Font(bold=True, size=14)
+    ws.merge_cells('A1:H1')
+    
+    headers = ['Employee Name', 'Username', 'Department', 'Present', 'Absent', 'Leave', 'Total Records', 'Total Hours']
+    if 'sites' in report_data:
+        headers.append('Site')
+    for col_idx, header in enumerate(headers, start=1):
+        cell = ws.cell(row=3, column=col_idx, value=header)
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    
+    for row_idx, emp in enumerate(report_data['employees'], start=4):
+        ws.cell(row=row_idx, column=1, value=emp['name'])
+        ws.cell(row=row_idx, column=2, value=emp['username'])
+        ws.cell(row=row_idx, column=3, value=emp['department'])
+        ws.cell(row=row_idx, column=4, value=emp['total_present'])
+        ws.cell(row=row_idx, column=5, value=emp['total_absent'])
+        ws.cell(row=row_idx, column=6, value=emp['total_leave'])
+        ws.cell(row=row_idx, column=7, value=emp['total_records'])
+        ws.cell(row=row_idx, column=8, value=emp['total_hours'])
+        if 'site' in emp:
+            ws.cell(row=row_idx, column=9, value=emp['site'])
+    
+    for col in ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I']:
+        ws.column_dimensions[col].width = 15
+    
+    output = BytesIO()
+    wb.save(output)
+    output.seek(0)
+    
+    return send_file(output, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                     as_attachment=True, download_name='Employee_Summary_Report.xlsx')
+
+
+@bp.route('/admin/export/working-hours-report')
+@login_required
+@metrics.timed(metrics.EXPORT_DURATION, 'working_hours_report')
+@read_only
+def working_hours_report():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+    
+    month = request.args.get('month', datetime.utcnow().month, type=int)
+    year = request.args.get('year', datetime.utcnow().year, type=int)
+    
+    report_data = get_working_hours_report(month, year)
+    
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Working Hours"
+    
+    # Header
+    month_name = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December'][month-1]
+    ws['A1'] = f"Working Hours Report - {month_name} {year}"
+    ws['A1'].font = Font(bold=True, size=14)
+    ws.merge_cells('A1:F1')
+    
+    # Summary
+    ws['A3'] = "Summary"
+    ws['A3'].font = Font(bold=True, size=12)
+    
+    ws['A4'] = "Total Hours:"
+    ws['B4'] = report_data['total_hours']
+    ws['A5'] = "Average Hours:"
+    ws['B5'] = report_data['average_hours']
+    
+    # Employee Data
+    ws['A7'] = "Employee Working Hours"
+    ws['A7'].font = Font(bold=True, size=12)
+    
+    headers = ['Employee Name', 'Username', 'Department', 'Working Days', 'Total Hours', 'Average Hours/Day']
+    if 'sites' in report_data:
+        headers.append('Site')
+    for col_idx, header in enumerate(headers, start=1):
+        cell = ws.cell(row=8, column=col_idx, value=header)
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    
+    for row_idx, emp in enumerate(report_data['employees'], start=9):
+        ws.cell(row=row_idx, column=1, value=emp['name'])
+        ws.cell(row=row_idx, column=2, value=emp['username'])
+        ws.cell(row=row_idx, column=3, value=emp['department'])
+        ws.cell(row=row_idx, column=4, value=emp['working_days'])
+        ws.cell(row=row_idx, column=5, value=emp['total_hours'])
+        ws.cell(row=row_idx, column=6, value=emp['average_hours'])
+        if 'site' in emp:
+            ws.cell(row=row_idx, column=7, value=emp['site'])
+    
+    for col in ['A', 'B', 'C', 'D', 'E', 'F', 'G']:
+        ws.column_dimensions[col].width = 16
+    
+    output = BytesIO()
+    wb.save(output)
+    output.seek(0)
+    
+    return send_file(output, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                     as_attachment=True, download_name=f'Working_Hours_Report_{month}_{year}.xlsx')
+
+
+@bp.route('/admin/export/absence-report')
+@login_required
+@metrics.timed(metrics.EXPORT_DURATION, 'absence_report')
+@read_only
+def absence_report():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+    
+    month = request.args.get('month', datetime.utcnow().month, type=int)
+    year = request.args.get('year', datetime.utcnow().year, type=int)
+    
+    report_data = get_absence_report(month, year)
+    
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Absence Report"
+    
+    # Header
+    month_name = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December'][month-1]
+    ws['A1'] = f"Absence Report - {month_name} {year}"
+    ws['A1'].font = Font(bold=True, size=14)
+    ws.merge_cells('A1:F1')
+    
+    # Summary
+    ws['A3'] = f"Total Absences: {report_data['total_absences']}"
+    ws['A3'].font = Font(bold=True)
+    
+    # Absence Data
+    headers = ['Employee Name', 'Username', 'Department', 'Date', 'Day', 'Notes']
+    if 'sites' in report_data:
+        headers.append('Site')
+    for col_idx, header in enumerate(headers, start=1):
+        cell = ws.cell(row=5, column=col_idx, value=header)
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    
+    for row_idx, absence in enumerate(report_data['absences'], start=6):
+        ws.cell(row=row_idx, column=1, value=absence['employee_name'])
+        ws.cell(row=row_idx, column=2, value=absence['username'])
+        ws.cell(row=row_idx, column=3, value=absence['department'])
+        ws.cell(row=row_idx, column=4, value=absence['date'])
+        ws.cell(row=row_idx, column=5, value=absence['day'])
+        ws.cell(row=row_idx, column=6, value=absence['notes'])
+        if 'site' in absence:
+            ws.cell(row=row_idx, column=7, value=absence['site'])
+    
+    for col in ['A', 'B', 'C', 'D', 'E', 'F', 'G']:
+        ws.column_dimensions[col].width = 16
+    
+    output = BytesIO()
+    wb.save(output)
+    output.seek(0)
+    
+    return send_file(output, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                     as_attachment=True, download_name=f'Absence_Report_{month}_{year}.xlsx')
+
+
+@bp.route('/admin/export/compliance-report')
+@login_required
+@metrics.timed(metrics.EXPORT_DURATION, 'compliance_report')
+@read_only
+def compliance_report():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+    
+    date_from, date_to = report_date_range()
+    report_data = get_compliance_report(date_from, date_to)
+    grace = report_data['grace_minutes']
+    cross_site = 'sites' in report_data
+    
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Compliance"
+    
+    # Header
+    ws['A1'] = f"Shift Compliance Report - {report_data['date_from']} to {report_data['date_to']}"
+    ws['A1'].font = Font(bold=True, size=14)
+    ws.merge_cells('A1:K1')
+    ws['A2'] = f"Late/early means more than {grace} minutes after shift start / before shift end"
+    
+    headers = ['Shifts', 'Late', 'Late Minutes', 'Max Late', 'Left Early', 'Early Minutes',
+               'Missed Check-outs', 'On Time %']
+    keys = ['shifts', 'late', 'late_minutes', 'max_late_minutes', 'early', 'early_minutes',
+            'missed_checkouts', 'on_time_rate']
+    
+    def write_table(start_row, title, label_headers, label_keys, rows):
+        ws.cell(row=start_row, column=1, value=title).font = Font(bold=True, size=12)
+        for col_idx, header in enumerate(label_headers + headers, start=1):
+            cell = ws.cell(row=start_row + 1, column=col_idx, value=header)
+            cell.font = Font(bold=True, color="FFFFFF")
+            cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+        for row_idx, row in enumerate(rows, start=start_row + 2):
+            for col_idx, key in enumerate(label_keys + keys, start=1):
+                ws.cell(row=row_idx, column=col_idx, value=row[key])
+        return start_row + len(rows) + 3
+    
+    next_row = write_table(4, "Overall", ['Headcount'], ['headcount'], [report_data['overall']])
+    next_row = write_table(next_row, "By Department", ['Department', 'Headcount'], ['department', 'headcount'],
+                           report_data['departments'])
+    employee_headers, employee_keys = ['Employee Name', 'Username', 'Department'], ['name', 'username', 'department']
+    if cross_site:
+        employee_headers, employee_keys = employee_headers + ['Site'], employee_keys + ['site']
+    write_table(next_row, "By Employee", employee_headers, employee_keys, report_data['employees'])
+    
+    for col in ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L']:
+        ws.column_dimensions[col].width = 16
+    
+    # Every late arrival, early departure and missed check-out
+    incidents = wb.create_sheet("Incidents")
+    incident_headers = ['Employee Name', 'Username', 'Department', 'Date', 'Shift Start', 'Shift End',
+                        'Check In', 'Check Out', 'Minutes Late', 'Minutes Early', 'Missed Check-out']
+    if cross_site:
+        incident_headers.append('Site')
+    for col_idx, header in enumerate(incident_headers, start=1):
+        cell = incidents.cell(row=1, column=col_idx, value=header)
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    
+    for row_idx, row in enumerate(compliance_incidents(date_from, date_to, grace), start=2):
+        (name, username, department, day, shift_start, shift_end, checked_in, checked_out,
+         minutes_late, minutes_early, missed) = row[:11]
+        incidents.cell(row=row_idx, column=1, value=name)
+        incidents.cell(row=row_idx, column=2, value=username)
+        incidents.cell(row=row_idx, column=3, value=department or '-')
+        incidents.cell(row=row_idx, column=4, value=day.strftime('%Y-%m-%d'))
+        incidents.cell(row=row_idx, column=5, value=shift_start.strftime('%H:%M'))
+        incidents.cell(row=row_idx, column=6, value=shift_end.strftime('%H:%M'))
+        incidents.cell(row=row_idx, column=7, value=checked_in.strftime('%H:%M:%S') if checked_in else '-')
+        incidents.cell(row=row_idx, column=8, value=checked_out.strftime('%H:%M:%S') if checked_out else '-')
+        incidents.cell(row=row_idx, column=9, value=round(minutes_late, 1) if minutes_late and minutes_late > grace else 0)
+        incidents.cell(row=row_idx, column=10, value=round(minutes_early, 1) if minutes_early and minutes_early > grace else 0)
+        incidents.cell(row=row_idx, column=11, value='Yes' if missed else '')
+        if cross_site:
+            incidents.cell(row=row_idx, column=12, value=row[11])
+    
+    for col in ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L']:
+        incidents.column_dimensions[col].width = 16
+    
+    output = BytesIO()
+    wb.save(output)
+    output.seek(0)
+    
+    return send_file(output, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                     as_attachment=True, download_name=f"Compliance_Report_{report_data['date_from']}_{report_data['date_to']}.xlsx")
+
+
+@bp.route('/admin/export/raw-attendance')
+@login_required
+@read_only
+def raw_attendance():
+    """Stream raw attendance rows as CSV or NDJSON, gzipped when the client accepts it.
+
+    Filters: date_from/date_to (YYYY-MM-DD), department, employee_id (repeatable).
+    Rows are read through a streaming cursor in chunks of RAW_EXPORT_CHUNK_SIZE
+    and written out as they arrive, so memory stays flat however large the
+    extract is and the first bytes go out before the query has finished.
+    """
+    if current_user.role != 'admin':
+        return jsonify({'success': False}), 403
+
+    fmt = request.args.get('format', 'csv', type=str)
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'success': False, 'message': 'format must be csv or ndjson'}), 400
+    try:
+        date_from = datetime.strptime(request.args['date_from'], '%Y-%m-%d').date() if request.args.get('date_from') else None
+        date_to = datetime.strptime(request.args['date_to'], '%Y-%m-%d').date() if request.args.get('date_to') else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Dates must be YYYY-MM-DD'}), 400
+    department = request.args.get('department', '', type=str).strip()
+    employee_ids = request.args.getlist('employee_id', type=int)
+
+    Att = attendance_for_range(date_from, date_to)
+    columns = [Att.id, Att.user_id, User.username, User.full_name, User.department,
+               Att.date, Att.status, Att.check_in, Att.check_out, Att.notes]
+    query = db.select(*columns).join(User, User.id == Att.user_id)
+    if date_from:
+        query = query.where(Att.date >= date_from)
+    if date_to:
+        query = query.where(Att.date <= date_to)
+    if department:
+        query = query.where(User.department == department)
+    if employee_ids:
+        query = query.where(Att.user_id.in_(employee_ids))
+    query = query.order_by(Att.date, Att.user_id, Att.id)
+
+    fields = ['id', 'user_id', 'username', 'full_name', 'department',
+              'date', 'status', 'check_in', 'check_out', 'notes']
+    chunk_size = current_app.config['RAW_EXPORT_CHUNK_SIZE']
+    use_gzip = request.accept_encodings['gzip'] > 0 and request.args.get('gzip', '1') != '0'
+
+    def encode_chunk(rows):
+        if fmt == 'csv':
+            # csv writes dates and datetimes with str(), i.e. 'YYYY-MM-DD HH:MM:SS'
+            buffer = StringIO()
+            csv.writer(buffer).writerows(rows)
+            return buffer.getvalue()
+        return ''.join(json.dumps(dict(zip(fields, row)), default=lambda v: v.isoformat(),
+                                  separators=(',', ':')) + '\n' for row in rows)
+
+    def generate():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if use_gzip else None
+
+        def emit(text):
+            data = text.encode('utf-8')
+            # Sync-flush each chunk so the client receives it now rather than when zlib's buffer fills
+            return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else data
+
+        if fmt == 'csv':
+            yield emit(','.join(fields) + '\r\n')
+        # Core execution on the session's connection (archives are attached there) skips ORM row loading
+        result = db.session.connection().execute(
+            query.execution_options(stream_results=True, max_row_buffer=chunk_size))
+        for rows in result.partitions(chunk_size):
+            yield emit(encode_chunk(rows))
+        if compressor:
+            yield compressor.flush()
+
+    extension = 'csv' if fmt == 'csv' else 'ndjson'
+    headers = {
+        'Content-Disposition': f'attachment; filename=attendance_{date_from or "start"}_{date_to or "end"}.{extension}',
+        'Vary': 'Accept-Encoding',
+        'Cache-Control': 'no-store',
+    }
+    if use_gzip:
+        headers['Content-Encoding'] = 'gzip'
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers=headers)
@@ -0,0 +1,73 @@
+"""Rebuilding and checking the per-employee monthly hours ledger (MonthlyHours).
+
+The ledger is kept current incrementally by the flush hook in ``models``;
+these functions recompute it from attendance, including archived years.
+"""
+from datetime import datetime
+
+from archive import attendance_for_range
+from models import db, MonthlyHours
+
+
+LEDGER_COLUMNS = ('worked_seconds', 'working_days', 'present', 'absent', 'leave', 'records')
+
+
+def _epoch_microseconds(column):
+    """Exact integer microseconds since the epoch of a stored 'YYYY-MM-DD HH:MM:SS[.ffffff]' value"""
+    stored = db.cast(column, db.String)
+    return (db.cast(db.func.strftime('%s', column), db.Integer) * 1000000
+            + db.cast(db.func.substr(stored, 21), db.Integer))
+
+
+def hours_ledger_source(first_user_id=None, last_user_id=None):
+    """MonthlyHours rows recomputed from attendance (hot table and archives)"""
+    Att = attendance_for_range()
+    worked = db.and_(Att.check_in.isnot(None), Att.check_out.isnot(None))
+    # Integer microseconds rather than julianday() keeps the sums exact, like the timedelta
+    # arithmetic used when the ledger is updated incrementally
+    worked_microseconds = _epoch_microseconds(Att.check_out) - _epoch_microseconds(Att.check_in)
+    query = db.select(
+        Att.user_id,
+        db.cast(db.func.strftime('%Y', Att.date), db.Integer).label('year'),
+        db.cast(db.func.strftime('%m', Att.date), db.Integer).label('month'),
+        db.func.coalesce(db.func.sum(db.case((worked, worked_microseconds))), 0) / 1000000.0,
+        db.func.sum(db.case((worked, 1), else_=0)),
+        db.func.sum(db.case((Att.status == 'present', 1), else_=0)),
+        db.func.sum(db.case((Att.status == 'absent', 1), else_=0)),
+        db.func.sum(db.case((Att.status == 'leave', 1), else_=0)),
+        db.func.count(),
+    )
+    if first_user_id is not None:
+        query = query.where(Att.user_id.between(first_user_id, last_user_id))
+    return query.group_by(Att.user_id, 'year', 'month')
+
+
+def rebuild_hours_ledger(first_user_id=None, last_user_id=None):
+    """Recompute MonthlyHours from scratch, for all employees or an id range. Returns rows written."""
+    delete = db.delete(MonthlyHours)
+    if first_user_id is not None:
+        delete = delete.where(MonthlyHours.user_id.between(first_user_id, last_user_id))
+    db.session.execute(delete)
+    source = hours_ledger_source(first_user_id, last_user_id).add_columns(
+        db.literal(datetime.utcnow(), db.DateTime))
+    result = db.session.execute(db.insert(MonthlyHours).from_select(
+        ['user_id', 'year', 'month', *LEDGER_COLUMNS, 'updated_at'], source))
+    db.session.commit()
+    return result.rowcount
+
+
+def verify_hours_ledger(tolerance_seconds=1.0):
+    """Compare MonthlyHours with freshly computed totals; returns a list of mismatches"""
+    expected = {row[:3]: row[3:] for row in db.session.execute(hours_ledger_source())}
+    actual = {row[:3]: row[3:] for row in db.session.execute(
+        db.select(MonthlyHours.user_id, MonthlyHours.year, MonthlyHours.month,
+                  *[getattr(MonthlyHours, c) for c in LEDGER_COLUMNS]))}
+    empty = (0.0, 0, 0, 0, 0, 0)
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        want, have = expected.get(key, empty), actual.get(key, empty)
+        if abs(want[0] - have[0]) > tolerance_seconds or tuple(want[1:]) != tuple(have[1:]):
+            mismatches.append({'user_id': key[0], 'year': key[1], 'month': key[2],
+                               'expected': dict(zip(LEDGER_COLUMNS, want)),
+                               'actual': dict(zip(LEDGER_COLUMNS, have))})
+    return mismatches
@@ -0,0 +1,237 @@
+"""SQLite upkeep and health reporting for ``flask db-maintain``.
+
+Months of punches leave free pages behind deletes and archiving, planner
+statistics go stale as tables grow, and the WAL file keeps whatever the last
+checkpoint could not copy back. These functions fix that (integrity check,
+ANALYZE, incremental vacuum, WAL checkpoint) and report what the database
+looks like: file, table and index sizes, row counts, unused space, and the
+query plans and timings of the statements the app runs most.
+
+Every step runs on its own autocommit connection to the current site's
+database, outside the session's transaction, as VACUUM and checkpoints
+require.
+"""
+import os
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+import schedules
+from models import db, Attendance, ChangeLog
+from reports import compliance_employees, department_figures, month_bounds, report_data_version
+
+AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+
+# Tables that grow with punches and headcount; a full scan of one of these is worth flagging
+SCAN_CHECKED_TABLES = ('user', 'attendance', 'rota', 'rota_override', 'change_log', 'monthly_hours')
+
+
+@contextmanager
+def maintenance_connection():
+    """Autocommit connection to the current site's database"""
+    engine = db.session.get_bind()
+    if engine.dialect.name != 'sqlite':
+        raise ValueError('Database maintenance is only implemented for SQLite.')
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        yield connection
+
+
+def _pragma(connection, name):
+    return connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+
+
+def integrity_check(full=False):
+    """Problems reported by ``PRAGMA quick_check`` (or the slower ``integrity_check``) and
+    ``foreign_key_check``; an empty list means the database is sound."""
+    with maintenance_connection() as connection:
+        problems = [row[0] for row in connection.exec_driver_sql(
+            'PRAGMA integrity_check' if full else 'PRAGMA quick_check')]
+        problems = [problem for problem in problems if problem != 'ok']
+        problems += [f'{table} row {rowid} references missing {parent}'
+                     for table, rowid, parent, _ in connection.exec_driver_sql('PRAGMA foreign_key_check')]
+    return problems
+
+
+def analyze():
+    """Refresh the planner statistics of every table and index, then let SQLite tune the rest"""
+    with maintenance_connection() as connection:
+        connection.exec_driver_sql('ANALYZE')
+        connection.exec_driver_sql('PRAGMA optimize')
+
+
+def incremental_vacuum():
+    """Return free pages to the filesystem; the number of pages freed, or None when the
+    database was not created with incremental auto-vacuum (see ``enable_incremental_vacuum``)."""
+    with maintenance_connection() as connection:
+        if _pragma(connection, 'auto_vacuum') != 2:
+            return None
+        before = _pragma(connection, 'freelist_count')
+        # Each step of the pragma frees one page; executescript runs it to completion
+        connection.connection.driver_connection.executescript('PRAGMA incremental_vacuum;')
+        return before - _pragma(connection, 'freelist_count')
+
+
+def enable_incremental_vacuum():
+    """Switch the database to incremental auto-vacuum; this rebuilds the whole file with a full
+    VACUUM, which blocks writers while it runs and needs free disk space the size of the database."""
+    with maintenance_connection() as connection:
+        connection.exec_driver_sql('PRAGMA auto_vacuum = INCREMENTAL')
+        connection.exec_driver_sql('VACUUM')
+
+
+def checkpoint_wal():
+    """Copy the WAL back into the database and truncate it.
+
+    Returns (busy, wal_pages, checkpointed_pages) from ``wal_checkpoint(TRUNCATE)``,
+    or None when the database is not in WAL mode. busy is 1 when a reader kept
+    the checkpoint from finishing.
+    """
+    with maintenance_connection() as connection:
+        if _pragma(connection, 'journal_mode') != 'wal':
+            return None
+        return tuple(connection.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)').one())
+
+
+def database_report():
+    """File sizes, free pages and, per table and index, size, unused space and row count.
+
+    Object sizes come from the ``dbstat`` virtual table and are left out when
+    SQLite was built without it.
+    """
+    with maintenance_connection() as connection:
+        path = connection.engine.url.database
+        page_size = _pragma(connection, 'page_size')
+        page_count = _pragma(connection, 'page_count')
+        freelist_count = _pragma(connection, 'freelist_count')
+        report = {
+            'path': path,
+            'file_bytes': os.path.getsize(path) if path and os.path.exists(path) else None,
+            'wal_bytes': os.path.getsize(f'{path}-wal') if path and os.path.exists(f'{path}-wal') else 0,
+            'journal_mode': _pragma(connection, 'journal_mode'),
+            'auto_vacuum': AUTO_VACUUM_MODES.get(_pragma(connection, 'auto_vacuum')),
+            'page_size': page_size,
+            'page_count': page_count,
+            'free_pages': freelist_count,
+            'free_ratio': freelist_count / page_count if page_count else 0.0,
+            'analyzed': bool(connection.exec_driver_sql(
+                "SELECT count(*) FROM sqlite_schema WHERE name = 'sqlite_stat1'").scalar()),
+        }
+
+        objects = {name: {'name': name, 'type': kind, 'table': table}
+                   for kind, name, table in connection.exec_driver_sql(
+                       "SELECT type, name, tbl_name FROM sqlite_schema WHERE type IN ('table', 'index')")}
+        try:
+            for name, pages, size, unused in connection.exec_driver_sql(
+                    "SELECT name, pageno, pgsize, unused FROM dbstat WHERE aggregate = TRUE"):
+                if name in objects:
+                    # Aggregated rows report the page count in pageno
+                    objects[name].update(pages=pages, bytes=size, unused_ratio=unused / size if size else 0.0)
+        except OperationalError:
+            pass
+        for entry in objects.values():
+            if entry['type'] == 'table':
+                entry['rows'] = connection.exec_driver_sql(f'SELECT count(*) FROM "{entry["name"]}"').scalar()
+        report['objects'] = sorted(objects.values(), key=lambda entry: (-entry.get('bytes', 0), entry['name']))
+    return report
+
+
+# ===================== Query plans =====================
+def _hot_queries(sample):
+    """The statements behind check-in, dashboards, the change feed and reports, as callables.
+
+    ``sample`` holds a real employee, day and change log position so the
+    statements run against data the way the app runs them.
+    """
+    day, user_id = sample['day'], sample['user_id']
+    first_day, last_day = month_bounds(day.month, day.year)
+    return (
+        ('check-in: effective shift', lambda: schedules.shift_for(user_id, day)),
+        ('check-in: attendance today', lambda: Attendance.query.filter_by(user_id=user_id, date=day).first()),
+        ('admin dashboard: present today', lambda: Attendance.query.filter(
+            Attendance.date == day, Attendance.status == 'present').count()),
+        ('employee records: first page', lambda: Attendance.query.filter_by(user_id=user_id).order_by(
+            Attendance.date.desc()).limit(10).all()),
+        ('attendance records: first page', lambda: Attendance.query.order_by(
+            Attendance.date.desc(), Attendance.check_in.desc()).limit(15).all()),
+        ('change feed: next page', lambda: db.session.execute(db.select(ChangeLog).where(
+            ChangeLog.id > sample['change_id']).order_by(ChangeLog.id).limit(501)).all()),
+        ('reports: cache key', lambda: report_data_version(first_day, last_day)),
+        ('reports: departments', lambda: department_figures(day.month, day.year)),
+        ('reports: shift compliance', lambda: compliance_employees(first_day, last_day, 5)),
+        ('mark-absences: shifts for a week', lambda: db.session.execute(
+            schedules.effective_shifts(day - timedelta(days=6), day)).all()),
+    )
+
+
+@contextmanager
+def captured_statements():
+    """Record (statement, parameters, seconds) of every statement the session's engine executes"""
+    engine = db.session.get_bind()
+    statements = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('maintenance_started', []).append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        # Until the rows are fetched, this is only the time to the first row
+        elapsed = time.perf_counter() - conn.info['maintenance_started'].pop()
+        if not executemany:
+            statements.append((statement, parameters, elapsed))
+
+    event.listen(engine, 'before_cursor_execute', before)
+    event.listen(engine, 'after_cursor_execute', after)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before)
+        event.remove(engine, 'after_cursor_execute', after)
+
+
+def explain_hot_queries():
+    """Time the app's hot statements and attach their query plans, slowest first.
+
+    Each entry has the query's name, the seconds a warm run took, its
+    slowest statement's SQL and
+    ``EXPLAIN QUERY PLAN`` lines, and the large tables (``SCAN_CHECKED_TABLES``)
+    it reads with a full scan, which is what usually goes wrong as data grows.
+    """
+    latest = db.session.query(Attendance.date, Attendance.user_id).order_by(Attendance.date.desc()).first()
+    if latest is None:
+        return []
+    sample = {
+        'day': latest[0],
+        'user_id': latest[1],
+        'change_id': max((db.session.query(db.func.max(ChangeLog.id)).scalar() or 0) - 500, 0),
+    }
+
+    results = []
+    for name, run in _hot_queries(sample):
+        # The first run builds and compiles the statements; time the second, as a warm worker runs it
+        run()
+        db.session.rollback()
+        with captured_statements() as statements:
+            started = time.perf_counter()
+            run()
+            seconds = time.perf_counter() - started
+        db.session.rollback()
+        if not statements:
+            continue
+        statement, parameters, _ = max(statements, key=lambda captured: captured[2])
+        plan = [row[3] for row in db.session.connection().exec_driver_sql(
+            'EXPLAIN QUERY PLAN ' + statement, parameters)]
+        results.append({
+            'name': name,
+            'seconds': seconds,
+            'statements': len(statements),
+            'sql': statement,
+            'plan': plan,
+            'full_scans': sorted({line.split()[1] for line in plan
+                                  if line.startswith('SCAN ') and ' USING ' not in line
+                                  and line.split()[1] in SCAN_CHECKED_TABLES}),
+        })
+        db.session.rollback()
+    return sorted(results, key=lambda result: -result['seconds'])
+
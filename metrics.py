@@ -0,0 +1,284 @@
+"""In-process metrics with a Prometheus text exposition endpoint.
+
+Recording a sample must stay cheap on the request path, so each thread
+writes to its own shard of every metric without taking a lock; shards are
+only summed when ``/metrics`` is scraped. Shards of threads that have
+exited are folded into a shared total at scrape time, which keeps memory
+bounded under servers that use a thread per request.
+"""
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+from flask import Response, current_app, g, request
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []  # (weakref to owning thread, shard dict)
+        self._retired = {}
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def shard(self):
+        """This thread's private {(metric name, label values): value} dict."""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+            return shard
+
+    def collect(self):
+        """Sum all shards into one {(metric name, label values): value} dict."""
+        with self._lock:
+            live = []
+            for thread_ref, shard in self._shards:
+                thread = thread_ref()
+                if thread is None or not thread.is_alive():
+                    _merge(self._retired, shard)
+                else:
+                    live.append((thread_ref, shard))
+            self._shards = live
+            totals = {}
+            _merge(totals, self._retired)
+            for _, shard in live:
+                _merge(totals, dict(shard))
+        return totals
+
+    def render(self):
+        totals = self.collect()
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render(totals))
+        return '\n'.join(lines) + '\n'
+
+
+def _merge(into, shard):
+    for key, value in list(shard.items()):
+        if isinstance(value, list):
+            current = into.get(key)
+            if current is None:
+                into[key] = list(value)
+            else:
+                for i, v in enumerate(value):
+                    current[i] += v
+        else:
+            into[key] = into.get(key, 0) + value
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value) if value != int(value) else str(int(value))
+    return str(value)
+
+
+class Counter:
+    """A counter that is either moved with inc or read from a callback at scrape time."""
+    kind = 'counter'
+
+    def __init__(self, registry, name, documentation, labelnames=(), callback=None):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        registry.register(self)
+
+    def inc(self, *labels, amount=1):
+        shard = self.registry.shard()
+        key = (self.name, labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def _series(self, totals):
+        if self.callback is not None:
+            try:
+                return sorted(self.callback().items())
+            except Exception:
+                return []
+        return sorted((labels, value) for (name, labels), value in totals.items() if name == self.name)
+
+    def render(self, totals):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for labels, value in self._series(totals):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Gauge(Counter):
+    """A gauge that is either moved with inc/dec or read from a callback at scrape time."""
+    kind = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        registry.register(self)
+
+    def observe(self, value, *labels):
+        shard = self.registry.shard()
+        key = (self.name, labels)
+        # Layout: one slot per bucket, one for +Inf, then sum and count
+        slots = shard.get(key)
+        if slots is None:
+            slots = shard[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        slots[bisect_left(self.buckets, value)] += 1
+        slots[-2] += value
+        slots[-1] += 1
+
+    def render(self, totals):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        series = sorted((labels, slots) for (name, labels), slots in totals.items() if name == self.name)
+        for labels, slots in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), slots):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _format_value(float(bound))
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="' + le + '"')
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(slots[-2])}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {slots[-1]}')
+        return lines
+
+
+registry = Registry()
+
+REQUEST_LATENCY = Histogram(registry, 'http_request_duration_seconds',
+                            'Request latency by endpoint.', ('endpoint', 'method'))
+REQUESTS = Counter(registry, 'http_requests_total', 'Requests by endpoint and status code.',
+                   ('endpoint', 'method', 'status'))
+IN_FLIGHT = Gauge(registry, 'http_requests_in_flight', 'Requests currently being served.', ('endpoint',))
+EXPORT_DURATION = Histogram(registry, 'export_duration_seconds', 'Time to build an Excel export.', ('export',))
+PUNCHES = Counter(registry, 'attendance_punches_total', 'Check-in and check-out attempts by outcome.',
+                  ('action', 'result', 'reason'))
+
+
+# Read from the app serving the scrape (see init_app); registered once, however many apps a process builds
+def _pool_stats():
+    db = current_app.extensions['metrics'].get('db')
+    if db is None:
+        return {}
+    stats = {}
+    # Every bind: read-only views and other sites' requests use their own engines
+    for bind, engine in db.engines.items():
+        for label, attr in (('checked_out', 'checkedout'), ('checked_in', 'checkedin'), ('size', 'size')):
+            if hasattr(engine.pool, attr):
+                stats[(bind or 'default', label)] = getattr(engine.pool, attr)()
+    return stats
+
+
+def _hashing_stats(keys):
+    def read():
+        password_hasher = current_app.extensions['metrics'].get('password_hasher')
+        if password_hasher is None:
+            return {}
+        stats = password_hasher.stats()
+        return {(key,): stats[key] for key in keys}
+    return read
+
+
+DB_POOL = Gauge(registry, 'db_pool_connections', 'Database connection pool usage by bind.', ('bind', 'state'),
+                callback=_pool_stats)
+HASHING_JOBS = Gauge(registry, 'password_hashing_jobs', 'Password hashing jobs running and queued.', ('state',),
+                     callback=_hashing_stats(('running', 'queued')))
+HASHING_JOBS_TOTAL = Counter(registry, 'password_hashing_jobs_total',
+                             'Password hashing jobs completed, rejected or timed out since start.', ('outcome',),
+                             callback=_hashing_stats(('completed', 'rejected', 'timed_out')))
+
+
+def record_punch(action, reason=None):
+    """Count a check-in/check-out; ``reason`` is set when the punch was rejected."""
+    if reason is None:
+        PUNCHES.inc(action, 'success', '')
+    else:
+        PUNCHES.inc(action, 'rejected', reason)
+
+
+class timed:
+    """Decorator/context manager recording elapsed seconds into a histogram."""
+
+    def __init__(self, histogram, *labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+    def __call__(self, fn):
+        from functools import wraps
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(self.histogram, *self.labels):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def init_app(app, db=None, password_hasher=None):
+    """Install request timing hooks and the ``/metrics`` endpoint."""
+    app.config.setdefault('METRICS_TOKEN', None)
+
+    def _endpoint():
+        return request.endpoint or 'unmatched'
+
+    @app.before_request
+    def _metrics_start():
+        g.metrics_started = time.perf_counter()
+        IN_FLIGHT.inc(_endpoint())
+
+    @app.after_request
+    def _metrics_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(exc):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        endpoint = _endpoint()
+        IN_FLIGHT.dec(endpoint)
+        REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint, request.method)
+        REQUESTS.inc(endpoint, request.method, str(g.pop('metrics_status', 500)))
+
+    app.extensions['metrics'] = {'db': db, 'password_hasher': password_hasher}
+
+    @app.route('/metrics')
+    def metrics():
+        token = app.config.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
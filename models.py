@@ -0,0 +1,369 @@
+"""Database models, and the flush hooks that keep the change log and hours ledger in step with them."""
+import json
+from datetime import datetime
+
+from flask import has_request_context
+from flask_login import UserMixin, current_user
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import read_routing
+import sharding
+from password_hashing import password_hasher
+
+db = SQLAlchemy(session_options={'class_': read_routing.RoutingSession})
+
+
+# ===================== Models =====================
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
+    full_name = db.Column(db.String(120), nullable=False)
+    role = db.Column(db.String(20), default='employee')  # 'admin' or 'employee'
+    department = db.Column(db.String(120))
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    site = db.Column(db.String(40), nullable=False, default=sharding.current_site)
+    attendance_records = db.relationship('Attendance', backref='user', lazy=True, cascade='all, delete-orphan')
+    rotas = db.relationship('Rota', backref='user', lazy=True, cascade='all, delete-orphan')
+    rota_overrides = db.relationship('RotaOverride', backref='user', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_user_role_department', 'role', 'department'),
+    )
+
+    def set_password(self, password):
+        self.password_hash = password_hasher.hash(password)
+
+    def check_password(self, password):
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
+
+    def get_id(self):
+        # Ids are only unique within a site's database
+        return f'{self.site}:{self.id}'
+
+    def __repr__(self):
+        return f'<User {self.username}>'
+
+
+class Attendance(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    check_in = db.Column(db.DateTime)
+    check_out = db.Column(db.DateTime)
+    date = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), default='present')  # 'present', 'absent', 'leave'
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    site = db.Column(db.String(40), nullable=False, default=sharding.current_site)
+
+    __table_args__ = (
+        db.Index('ix_attendance_user_date', 'user_id', 'date'),
+        db.Index('ix_attendance_date', 'date'),
+    )
+
+    def __repr__(self):
+        return f'<Attendance {self.user_id} - {self.date}>'
+
+
+class Rota(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day_of_week = db.Column(db.String(20), nullable=False)  # 'Monday', 'Tuesday', etc.
+    shift_start = db.Column(db.Time, nullable=False)
+    shift_end = db.Column(db.Time, nullable=False)
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    site = db.Column(db.String(40), nullable=False, default=sharding.current_site)
+
+    __table_args__ = (
+        db.Index('ix_rota_user_day', 'user_id', 'day_of_week'),
+    )
+
+    def __repr__(self):
+        return f'<Rota {self.user_id} - {self.day_of_week}>'
+
+
+class RotaOverride(db.Model):
+    """A dated exception to an employee's weekly rota: a one-off shift, or days off when the times are empty.
+
+    Covers date_from..date_to inclusive and wins over both the weekly rota and
+    holidays; an employee's overrides never overlap.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date_from = db.Column(db.Date, nullable=False)
+    date_to = db.Column(db.Date, nullable=False)
+    shift_start = db.Column(db.Time)
+    shift_end = db.Column(db.Time)
+    reason = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    site = db.Column(db.String(40), nullable=False, default=sharding.current_site)
+
+    __table_args__ = (
+        db.Index('ix_rota_override_user_dates', 'user_id', 'date_from', 'date_to'),
+        db.Index('ix_rota_override_dates', 'date_from', 'date_to'),
+    )
+
+    @property
+    def is_day_off(self):
+        return self.shift_start is None
+
+    def __repr__(self):
+        return f'<RotaOverride {self.user_id} {self.date_from}..{self.date_to}>'
+
+
+class Holiday(db.Model):
+    """A company holiday: nobody is rostered that day unless an override says otherwise"""
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, unique=True, nullable=False)
+    name = db.Column(db.String(120), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Holiday {self.date} {self.name}>'
+
+
+class ShiftTemplate(db.Model):
+    """A named weekly shift pattern that can be applied to many employees' rotas at once"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    days = db.relationship('ShiftTemplateDay', backref='template', lazy=True, cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<ShiftTemplate {self.name}>'
+
+
+class ShiftTemplateDay(db.Model):
+    """One working day of a shift template; days without a row are days off"""
+    id = db.Column(db.Integer, primary_key=True)
+    template_id = db.Column(db.Integer, db.ForeignKey('shift_template.id'), nullable=False)
+    day_of_week = db.Column(db.String(20), nullable=False)  # 'Monday', 'Tuesday', etc.
+    shift_start = db.Column(db.Time, nullable=False)
+    shift_end = db.Column(db.Time, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('template_id', 'day_of_week', name='uq_shift_template_day'),
+    )
+
+    def __repr__(self):
+        return f'<ShiftTemplateDay {self.template_id} - {self.day_of_week}>'
+
+
+class AttendanceArchive(db.Model):
+    """A closed year of attendance moved out of the hot table into its own SQLite file"""
+    year = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(500), nullable=False)
+    row_count = db.Column(db.Integer, default=0)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AttendanceArchive {self.year}>'
+
+
+class ChangeLog(db.Model):
+    """Append-only record of changes to employees, attendance and rotas.
+
+    Rows are written in the same transaction as the change itself, so the id
+    is a cursor consumers can resume from without missing or replaying work.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)  # 'user', 'attendance', 'rota', 'rota_override', 'holiday'
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # 'insert', 'update', 'delete'
+    user_id = db.Column(db.Integer)  # employee the row belongs to
+    actor_id = db.Column(db.Integer)  # who made the change, if done through a request
+    data = db.Column(db.Text)  # JSON snapshot of the row after the change; null for deletes
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # AUTOINCREMENT: ids are never reused, so a cursor can't skip rows after a delete
+    __table_args__ = (
+        db.Index('ix_change_log_entity_id', 'entity', 'id'),
+        # Latest change to one employee's records, e.g. for their dashboard state version
+        db.Index('ix_change_log_user_entity_id', 'user_id', 'entity', 'id'),
+        {'sqlite_autoincrement': True},
+    )
+
+    def __repr__(self):
+        return f'<ChangeLog {self.id} {self.op} {self.entity} {self.entity_id}>'
+
+
+class MonthlyHours(db.Model):
+    """Per-employee, per-month ledger of worked time and attendance counts.
+
+    Kept current by the after_flush hook below as attendance is written, so
+    totals are read with a primary key lookup instead of re-summing records.
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    worked_seconds = db.Column(db.Float, nullable=False, default=0)
+    working_days = db.Column(db.Integer, nullable=False, default=0)  # records with both check-in and check-out
+    present = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+    leave = db.Column(db.Integer, nullable=False, default=0)
+    records = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_monthly_hours_period', 'year', 'month'),
+    )
+
+    @property
+    def total_hours(self):
+        return self.worked_seconds / 3600
+
+    def __repr__(self):
+        return f'<MonthlyHours {self.user_id} {self.year}-{self.month:02d}>'
+
+
+# Columns published in the change feed (password hashes and bookkeeping are left out)
+CHANGE_LOG_FIELDS = {
+    User: ('id', 'username', 'email', 'full_name', 'role', 'department', 'is_active'),
+    Attendance: ('id', 'user_id', 'date', 'status', 'check_in', 'check_out', 'notes'),
+    Rota: ('id', 'user_id', 'day_of_week', 'shift_start', 'shift_end', 'is_active'),
+    RotaOverride: ('id', 'user_id', 'date_from', 'date_to', 'shift_start', 'shift_end', 'reason'),
+    Holiday: ('id', 'date', 'name'),
+}
+CHANGE_LOG_ENTITIES = {User: 'user', Attendance: 'attendance', Rota: 'rota', RotaOverride: 'rota_override',
+                       Holiday: 'holiday'}
+
+
+def _change_data(obj, fields):
+    return json.dumps({field: _change_value(getattr(obj, field)) for field in fields}, separators=(',', ':'))
+
+
+def _change_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _actor_id():
+    if has_request_context() and current_user.is_authenticated:
+        return current_user.id
+    return None
+
+
+def _change_log_row(model, obj, op, actor_id, now):
+    return {
+        'entity': CHANGE_LOG_ENTITIES[model],
+        'entity_id': obj.id,
+        'op': op,
+        'user_id': obj.id if model is User else getattr(obj, 'user_id', None),
+        'actor_id': actor_id,
+        'data': None if op == 'delete' else _change_data(obj, CHANGE_LOG_FIELDS[model]),
+        'changed_at': now,
+    }
+
+
+@db.event.listens_for(db.session, 'after_flush')
+def record_changes(session, flush_context):
+    """Write change log rows for flushed User/Attendance/Rota objects on the same connection"""
+    actor_id = _actor_id()
+    now = datetime.utcnow()
+    rows = []
+
+    def add(obj, op):
+        rows.append(_change_log_row(type(obj), obj, op, actor_id, now))
+
+    for obj in session.new:
+        if type(obj) in CHANGE_LOG_FIELDS:
+            add(obj, 'insert')
+    for obj in session.dirty:
+        fields = CHANGE_LOG_FIELDS.get(type(obj))
+        # Only changes to published columns count (e.g. not a password rehash)
+        if fields and any(db.inspect(obj).attrs[field].history.has_changes() for field in fields):
+            add(obj, 'update')
+    for obj in session.deleted:
+        if type(obj) in CHANGE_LOG_FIELDS:
+            add(obj, 'delete')
+
+    if rows:
+        session.connection().execute(ChangeLog.__table__.insert(), rows)
+
+
+def record_bulk_changes(model, op, rows):
+    """Write change log rows for ``model`` rows changed by a bulk statement, which bypasses the flush hook.
+
+    ``rows`` are result rows (e.g. from RETURNING) with the model's published
+    columns; they are logged on the session's connection, so they commit or
+    roll back with the change.
+    """
+    now = datetime.utcnow()
+    actor_id = _actor_id()
+    entries = [_change_log_row(model, row, op, actor_id, now) for row in rows]
+    if entries:
+        db.session.execute(ChangeLog.__table__.insert(), entries)
+
+
+def _ledger_contribution(check_in, check_out, status):
+    """What one attendance record adds to its month's MonthlyHours row"""
+    worked = check_in is not None and check_out is not None
+    return {
+        'worked_seconds': (check_out - check_in).total_seconds() if worked else 0.0,
+        'working_days': 1 if worked else 0,
+        'present': 1 if status == 'present' else 0,
+        'absent': 1 if status == 'absent' else 0,
+        'leave': 1 if status == 'leave' else 0,
+        'records': 1,
+    }
+
+
+def _ledger_old_value(state, field):
+    history = state.attrs[field].history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else None
+
+
+@db.event.listens_for(db.session, 'after_flush')
+def update_hours_ledger(session, flush_context):
+    """Apply attendance inserts, updates and deletes to MonthlyHours in the same transaction"""
+    fields = ('user_id', 'date', 'check_in', 'check_out', 'status')
+    deltas = {}
+
+    def apply(user_id, date, contribution, sign):
+        if user_id is None or date is None:
+            return
+        delta = deltas.setdefault((user_id, date.year, date.month), dict.fromkeys(contribution, 0))
+        for key, value in contribution.items():
+            delta[key] += sign * value
+
+    for obj in session.new:
+        if isinstance(obj, Attendance):
+            apply(obj.user_id, obj.date, _ledger_contribution(obj.check_in, obj.check_out, obj.status), 1)
+    for obj in session.dirty:
+        if not isinstance(obj, Attendance):
+            continue
+        state = db.inspect(obj)
+        if not any(state.attrs[field].history.has_changes() for field in fields):
+            continue
+        old = {field: _ledger_old_value(state, field) for field in fields}
+        apply(old['user_id'], old['date'],
+              _ledger_contribution(old['check_in'], old['check_out'], old['status']), -1)
+        apply(obj.user_id, obj.date, _ledger_contribution(obj.check_in, obj.check_out, obj.status), 1)
+    deleted_users = [obj.id for obj in session.deleted if isinstance(obj, User)]
+    for obj in session.deleted:
+        if isinstance(obj, Attendance) and obj.user_id not in deleted_users:
+            state = db.inspect(obj)
+            old = {field: _ledger_old_value(state, field) for field in fields}
+            apply(old['user_id'], old['date'],
+                  _ledger_contribution(old['check_in'], old['check_out'], old['status']), -1)
+
+    connection = session.connection()
+    if deltas:
+        table = MonthlyHours.__table__
+        now = datetime.utcnow()
+        for (user_id, year, month), delta in deltas.items():
+            stmt = sqlite_insert(table).values(user_id=user_id, year=year, month=month, updated_at=now, **delta)
+            connection.execute(stmt.on_conflict_do_update(
+                index_elements=['user_id', 'year', 'month'],
+                set_=dict({key: table.c[key] + stmt.excluded[key] for key in delta}, updated_at=now)))
+    if deleted_users:
+        connection.execute(db.delete(MonthlyHours).where(MonthlyHours.user_id.in_(deleted_users)))
@@ -0,0 +1,156 @@
+"""Bounded password hashing for the login path.
+
+Key-derivation work (pbkdf2/scrypt) is deliberately expensive. Running it
+inline on every worker thread means a burst of logins at shift start can
+occupy all of them, so check-ins and dashboards queue behind it. All hashing
+goes through a small dedicated thread pool instead; hashlib releases the GIL
+while deriving keys, so the pool size is the effective CPU cap for logins.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full or a job waited too long."""
+
+
+def normalize_method(method):
+    """Expand a werkzeug hash method to the full prefix stored in hashes,
+    e.g. 'pbkdf2' -> 'pbkdf2:sha256:600000'."""
+    parts = method.split(':')
+    if parts[0] == 'pbkdf2':
+        hash_name = parts[1] if len(parts) > 1 else 'sha256'
+        iterations = parts[2] if len(parts) > 2 else str(DEFAULT_PBKDF2_ITERATIONS)
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if parts[0] == 'scrypt':
+        n = parts[1] if len(parts) > 1 else str(2 ** 15)
+        r = parts[2] if len(parts) > 2 else '8'
+        p = parts[3] if len(parts) > 3 else '1'
+        return f'scrypt:{n}:{r}:{p}'
+    return method
+
+
+class PasswordHasher:
+    """Runs password hashing on a bounded executor with admission control.
+
+    At most ``workers`` hashes run at once and at most ``queue_size`` more
+    may wait. Anything beyond that is rejected immediately with
+    ``HashingBusy`` rather than piling up behind the pool.
+    """
+
+    def __init__(self, method='pbkdf2', workers=2, queue_size=32, timeout=10.0):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self._stats = {}
+        self.configure(method, workers, queue_size, timeout)
+
+    def configure(self, method, workers, queue_size, timeout):
+        with self._lock:
+            old = self._executor
+            self.method = normalize_method(method)
+            self.workers = max(1, int(workers))
+            self.queue_size = max(0, int(queue_size))
+            self.timeout = float(timeout)
+            self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix='pwhash')
+            self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+            self._stats = {
+                'in_flight': 0,
+                'running': 0,
+                'completed': 0,
+                'rejected': 0,
+                'timed_out': 0,
+                'rehashed': 0,
+                'wait_seconds_total': 0.0,
+                'hash_seconds_total': 0.0,
+            }
+        if old is not None:
+            old.shutdown(wait=False)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+        app.config.setdefault('PASSWORD_HASH_WORKERS', 2)
+        app.config.setdefault('PASSWORD_HASH_QUEUE_SIZE', 32)
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 10.0)
+        self.configure(app.config['PASSWORD_HASH_METHOD'],
+                       app.config['PASSWORD_HASH_WORKERS'],
+                       app.config['PASSWORD_HASH_QUEUE_SIZE'],
+                       app.config['PASSWORD_HASH_TIMEOUT'])
+        app.extensions['password_hasher'] = self
+
+    def _run(self, fn, *args):
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HashingBusy('Password hashing queue is full')
+
+        submitted = time.perf_counter()
+        with self._lock:
+            self._stats['in_flight'] += 1
+
+        def job():
+            started = time.perf_counter()
+            with self._lock:
+                self._stats['running'] += 1
+                self._stats['wait_seconds_total'] += started - submitted
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._stats['running'] -= 1
+                    self._stats['in_flight'] -= 1
+                    self._stats['completed'] += 1
+                    self._stats['hash_seconds_total'] += time.perf_counter() - started
+                slots.release()
+
+        try:
+            future = self._executor.submit(job)
+        except RuntimeError:
+            with self._lock:
+                self._stats['in_flight'] -= 1
+            slots.release()
+            raise
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # The job keeps its slot until it actually finishes.
+            with self._lock:
+                self._stats['timed_out'] += 1
+            raise HashingBusy('Password hashing timed out')
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        if not pwhash or password is None:
+            return False
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True when a stored hash was made with different cost parameters."""
+        return pwhash.split('$', 1)[0] != self.method
+
+    def record_rehash(self):
+        with self._lock:
+            self._stats['rehashed'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queued'] = stats['in_flight'] - stats['running']
+        stats['workers'] = self.workers
+        stats['queue_size'] = self.queue_size
+        stats['method'] = self.method
+        return stats
+
+
+password_hasher = PasswordHasher()
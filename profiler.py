@@ -0,0 +1,163 @@
+"""On-demand profiling of single requests for admins.
+
+An admin adds ``?_profile=1`` or an ``X-Profile: 1`` header to any request.
+That request then runs under cProfile while a sampling thread records its
+call stacks; the results are stored on disk as a pstats dump plus collapsed
+stacks (the input format of flamegraph.pl and speedscope). Requests without
+the flag only pay for the flag check.
+"""
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request
+from flask_login import current_user
+
+PROFILE_ID = re.compile(r'^[0-9]{8}T[0-9]{6}-[0-9a-f]{6}-[A-Za-z0-9_.]+$')
+
+
+class StackSampler(threading.Thread):
+    """Samples the call stack of one thread at a fixed interval."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class RequestProfiler:
+    def __init__(self, app=None):
+        self.directory = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILER_ENABLED', True)
+        app.config.setdefault('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+        app.config.setdefault('PROFILE_KEEP', 50)
+        app.config.setdefault('PROFILE_SAMPLE_INTERVAL', 0.002)
+        app.extensions['profiler'] = self
+        self.directory = app.config['PROFILE_DIR']
+        self.keep = int(app.config['PROFILE_KEEP'])
+        self.interval = float(app.config['PROFILE_SAMPLE_INTERVAL'])
+        if not app.config['PROFILER_ENABLED']:
+            return
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._abort)
+
+    def _requested(self):
+        return request.headers.get('X-Profile') == '1' or request.args.get('_profile') == '1'
+
+    def _start(self):
+        if not self._requested():
+            return
+        if not (current_user.is_authenticated and current_user.role == 'admin'):
+            return
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        profile = cProfile.Profile()
+        g.profiler = (profile, sampler, time.perf_counter())
+        sampler.start()
+        profile.enable()
+
+    def _finish(self, response):
+        state = g.pop('profiler', None)
+        if state is None:
+            return response
+        profile, sampler, started = state
+        profile.disable()
+        sampler.stop()
+        elapsed = time.perf_counter() - started
+
+        profile_id = self._save(profile, sampler.samples, elapsed, response.status_code)
+        response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    def _abort(self, exc):
+        # after_request is skipped when the view raised; still stop profiling
+        state = g.pop('profiler', None)
+        if state is not None:
+            state[0].disable()
+            state[1].stop()
+
+    def _save(self, profile, samples, elapsed, status):
+        os.makedirs(self.directory, exist_ok=True)
+        endpoint = re.sub(r'[^A-Za-z0-9_.]', '_', request.endpoint or 'unmatched')
+        profile_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{os.urandom(3).hex()}-{endpoint}"
+        base = os.path.join(self.directory, profile_id)
+
+        profile.dump_stats(base + '.prof')
+        with open(base + '.collapsed', 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+        with open(base + '.json', 'w') as f:
+            json.dump({
+                'id': profile_id,
+                'endpoint': request.endpoint,
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'status': status,
+                'duration_ms': round(elapsed * 1000, 2),
+                'samples': sum(samples.values()),
+                'user': current_user.username,
+                'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            }, f)
+
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        for profile in self.list()[self.keep:]:
+            for ext in ('.prof', '.collapsed', '.json'):
+                try:
+                    os.remove(os.path.join(self.directory, profile['id'] + ext))
+                except FileNotFoundError:
+                    pass
+
+    def list(self):
+        """Stored profiles, newest first."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(profiles, key=lambda p: p['id'], reverse=True)
+
+    def path(self, profile_id, fmt):
+        """Filesystem path of a stored profile in ``fmt`` ('prof' or 'collapsed'), or None."""
+        if fmt not in ('prof', 'collapsed') or not PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f'{profile_id}.{fmt}')
+        return path if os.path.exists(path) else None
+
+
+request_profiler = RequestProfiler()
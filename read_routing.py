@@ -0,0 +1,71 @@
+"""Send report, export and dashboard reads to a separate read-only engine.
+
+Views decorated with ``@read_only`` run their queries through the ``read``
+bind instead of the primary engine. For a SQLite file that bind is the same
+file opened with ``mode=ro`` while the primary runs in WAL mode, so a long
+report reads from its own snapshot and never holds a lock that a check-in
+has to wait for; ``READ_DATABASE_URL`` can point it at a replica instead.
+Flushes and INSERT/UPDATE/DELETE statements always go to the primary, so
+the query code itself does not change. ``g.binds`` can swap the (write,
+read) pair of bind keys for the current app context; ``sharding`` uses it to
+select a site's database.
+"""
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+
+READ_BIND = 'read'
+
+
+def read_only_url(url):
+    """``mode=ro`` URI for the same SQLite file as ``url``, or None for other databases"""
+    url = sa.engine.make_url(url)
+    if url.drivername not in ('sqlite', 'sqlite+pysqlite') or url.database in (None, '', ':memory:'):
+        return None
+    database = url.database if url.query.get('uri') else f'file:{url.database}'
+    query = dict(url.query, uri='true', mode='ro')
+    return f'{url.drivername}:///{database}?' + '&'.join(f'{key}={value}' for key, value in query.items())
+
+
+def read_only(view):
+    """Mark a view as read-only so that its queries use the read engine."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    """``db.session`` class that uses the read bind inside ``@read_only`` views."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            write_key, read_key = g.get('binds', (None, READ_BIND))
+            engines = self._db.engines
+            if (g.get('read_only') and read_key in engines and not self._flushing
+                    and not isinstance(clause, sa.sql.dml.UpdateBase)):
+                return engines[read_key]
+            if write_key is not None:
+                return engines[write_key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def init_app(app, db):
+    """Switch writable SQLite databases to WAL so readers and the writer don't block each other."""
+    app.config.setdefault('SQLITE_WAL', True)
+    if not app.config['SQLITE_WAL']:
+        return
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name == 'sqlite' and engine.url.query.get('mode') != 'ro':
+            sa.event.listen(engine, 'connect', _enable_wal)
+
+
+def _enable_wal(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.close()
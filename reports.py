@@ -0,0 +1,601 @@
+"""The reports page and the report builders behind it and the Excel exports.
+
+numpy (through ``analytics``) is only imported by the range analytics
+report, the first time it runs.
+"""
+import functools
+from datetime import datetime
+
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, jsonify
+from flask_login import login_required, current_user
+from werkzeug.local import LocalProxy
+
+import schedules
+import sharding
+from archive import attendance_for_range
+from models import db, User, Attendance, ChangeLog, MonthlyHours
+from read_routing import read_only
+
+bp = Blueprint('report', __name__)
+
+
+@bp.route('/admin/reports')
+@login_required
+@read_only
+def reports():
+    if current_user.role != 'admin':
+        return redirect(url_for('auth.index'))
+    
+    report_type = request.args.get('type', 'monthly', type=str)
+    month = request.args.get('month', datetime.utcnow().month, type=int)
+    year = request.args.get('year', datetime.utcnow().year, type=int)
+    
+    date_from, date_to = report_date_range()
+
+    @functools.cache
+    def build_report():
+        if report_type == 'monthly':
+            return get_monthly_report(month, year)
+        elif report_type == 'employee':
+            return get_employee_summary_report()
+        elif report_type == 'working_hours':
+            return get_working_hours_report(month, year)
+        elif report_type == 'absence':
+            return get_absence_report(month, year)
+        elif report_type == 'analytics':
+            return get_range_analytics(date_from, date_to)
+        elif report_type == 'compliance':
+            return get_compliance_report(date_from, date_to)
+        elif report_type == 'departments':
+            return get_department_report(month, year)
+        return {}
+
+    # The report is built on first use, so a cached fragment skips its queries as well as its rendering
+    return render_template('reports.html', 
+                         report_type=report_type,
+                         report_data=LocalProxy(build_report),
+                         report_key=report_fragment_key(report_type, date_from, date_to),
+                         month=month,
+                         year=year,
+                         date_from=date_from.strftime('%Y-%m-%d'),
+                         date_to=date_to.strftime('%Y-%m-%d'))
+
+
+@bp.route('/api/admin/departments')
+@login_required
+@read_only
+def get_department_stats():
+    if current_user.role != 'admin':
+        return jsonify({'success': False}), 403
+
+    month = request.args.get('month', datetime.utcnow().month, type=int)
+    year = request.args.get('year', datetime.utcnow().year, type=int)
+    return jsonify(get_department_report(month, year))
+
+
+def month_bounds(month, year):
+    """First and last date of a calendar month"""
+    from calendar import monthrange
+
+    return datetime(year, month, 1).date(), datetime(year, month, monthrange(year, month)[1]).date()
+
+
+def report_date_range():
+    """from/to request args as dates; defaults to the current month up to today"""
+    today = datetime.utcnow().date()
+    try:
+        date_from = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else today.replace(day=1)
+        date_to = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else today
+    except ValueError:
+        date_from, date_to = today.replace(day=1), today
+    if date_to < date_from:
+        date_from, date_to = date_to, date_from
+    return date_from, date_to
+
+
+@sharding.cross_site(tuple)
+def report_data_version(start_date, end_date):
+    """What changes whenever a report over start_date..end_date can change.
+
+    Every attendance write updates the ledger rows of its month, so their
+    latest update, count and record total cover attendance; the newest
+    employee, rota, rota override or holiday change log id covers the rest.
+    """
+    ledger = db.session.query(db.func.max(MonthlyHours.updated_at), db.func.count(),
+                              db.func.total(MonthlyHours.records)).filter(
+        MonthlyHours.year.between(start_date.year, end_date.year),
+        (MonthlyHours.year * 12 + MonthlyHours.month).between(start_date.year * 12 + start_date.month,
+                                                             end_date.year * 12 + end_date.month)).one()
+    people = db.session.query(db.func.max(ChangeLog.id)).filter(ChangeLog.entity.in_(('user', 'rota', 'rota_override', 'holiday'))).scalar()
+    return (*ledger, people)
+
+
+def report_fragment_key(report_type, date_from, date_to):
+    """Fragment cache key of an analytics/compliance report's tables, or None while its range includes today"""
+    if report_type not in ('analytics', 'compliance') or date_to >= datetime.utcnow().date():
+        return None
+    site = sharding.ALL_SITES if sharding.all_sites_selected() else sharding.current_site()
+    return (report_type, site, date_from, date_to, report_data_version(date_from, date_to))
+
+
+def load_attendance_frame(start_date, end_date):
+    """Attendance between start_date and end_date as NumPy columns.
+
+    Dates and punches are converted to epoch days/seconds by SQLite itself, so
+    rows come back as plain numbers and go straight into one array.
+    """
+    import analytics
+
+    Att = attendance_for_range(start_date, end_date)
+    unix_epoch = 2440587.5  # julianday('1970-01-01')
+    status_code = db.case(
+        *[(Att.status == status, code) for status, code in analytics.STATUS_CODES.items() if status != 'other'],
+        else_=analytics.STATUS_CODES['other'])
+    query = db.select(
+        Att.user_id,
+        db.cast(db.func.julianday(Att.date) - unix_epoch, db.Integer),
+        status_code,
+        (db.func.julianday(Att.check_in) - unix_epoch) * 86400.0,
+        (db.func.julianday(Att.check_out) - unix_epoch) * 86400.0,
+    ).where(Att.date >= start_date, Att.date <= end_date)
+    # Plain tuples: numpy probes Row objects key by key, which is far slower than the query
+    return analytics.AttendanceFrame.from_rows(list(map(tuple, db.session.connection().execute(query))))
+
+
+def merge_analytics_inputs(results):
+    """Combine per-site employees and frames, renumbering employees so ids don't collide.
+
+    Merged employee tuples carry the site and the site's own id after the
+    usual (id, name, username, department).
+    """
+    import analytics
+
+    employees, frames, offset = [], [], 0
+    for site, (site_employees, frame) in results:
+        ids = [e[0] for e in site_employees] + ([int(frame.user_id.max())] if len(frame) else [])
+        employees.extend((offset + e[0], e[1], e[2], e[3], site, e[0]) for e in site_employees)
+        frame.user_id = frame.user_id + offset
+        frames.append(frame)
+        offset += max(ids, default=0) + 1
+    employees.sort(key=lambda e: e[1])
+    return employees, analytics.AttendanceFrame.concatenate(frames)
+
+
+@sharding.cross_site(merge_analytics_inputs)
+def range_analytics_inputs(start_date, end_date):
+    """Employees as (id, name, username, department) tuples and the attendance frame for the range"""
+    employees = db.session.execute(
+        db.select(User.id, User.full_name, User.username, User.department)
+        .where(User.role == 'employee').order_by(User.full_name)).all()
+    return employees, load_attendance_frame(start_date, end_date)
+
+
+def get_range_analytics(start_date, end_date):
+    """Per-employee and per-department analytics for an arbitrary date range"""
+    import analytics
+
+    employees, frame = range_analytics_inputs(start_date, end_date)
+    report = analytics.summarize(frame, employees, start_date, end_date,
+                                 standard_shift_seconds=current_app.config['STANDARD_SHIFT_HOURS'] * 3600)
+    report.update({
+        'date_from': start_date.strftime('%Y-%m-%d'),
+        'date_to': end_date.strftime('%Y-%m-%d'),
+        'records': len(frame),
+    })
+    if sharding.all_sites_selected():
+        for row, employee in zip(report['employees'], employees):
+            row['site'], row['id'] = employee[4], employee[5]
+        report['sites'] = sharding.sites()
+    return report
+
+
+def compliance_punches(start_date, end_date):
+    """One row per 'present' record in the range, scored against its scheduled shift.
+
+    Each record is matched with the employee's effective shift that day
+    (weekly rota, dated overrides and holidays; records on days off are
+    left out). SQLite computes the minutes late, minutes left early and
+    whether the check-out is missing (only for days before today), so no
+    record is looked at in Python. Overnight shifts end on the following day.
+    """
+    Att = attendance_for_range(start_date, end_date)
+    query, shift_start, shift_end = schedules.join_effective_shift(db.select(
+        Att.user_id.label('user_id'), Att.date.label('date'),
+        Att.check_in.label('check_in'), Att.check_out.label('check_out'),
+    ), Att.user_id, Att.date)
+    shifts = query.add_columns(shift_start.label('shift_start'), shift_end.label('shift_end')).where(
+        Att.date >= start_date, Att.date <= end_date, Att.status == 'present').subquery('scheduled')
+
+    day = db.cast(shifts.c.date, db.String)
+    scheduled_start = db.func.julianday(day + ' ' + db.cast(shifts.c.shift_start, db.String))
+    scheduled_end = db.func.julianday(
+        day + ' ' + db.cast(shifts.c.shift_end, db.String),
+        db.case((shifts.c.shift_end <= shifts.c.shift_start, '+1 day'), else_='+0 days'))
+    minutes_late = db.func.max(0, (db.func.julianday(shifts.c.check_in) - scheduled_start) * 1440)
+    minutes_early = db.func.max(0, (scheduled_end - db.func.julianday(shifts.c.check_out)) * 1440)
+    missed_checkout = db.case(
+        (db.and_(shifts.c.check_in.isnot(None), shifts.c.check_out.is_(None),
+                 shifts.c.date < datetime.utcnow().date()), 1),
+        else_=0)
+
+    return db.select(
+        shifts.c.user_id, shifts.c.date,
+        shifts.c.shift_start, shifts.c.shift_end,
+        shifts.c.check_in, shifts.c.check_out,
+        db.case((shifts.c.check_in.isnot(None), minutes_late)).label('minutes_late'),
+        db.case((shifts.c.check_out.isnot(None), minutes_early)).label('minutes_early'),
+        missed_checkout.label('missed_checkout'),
+    ).where(shifts.c.shift_start.isnot(None))
+
+
+def _compliance_summary(rows):
+    """Roll per-employee compliance rows up into one summary row"""
+    summary = {
+        'headcount': len(rows),
+        'shifts': sum(r['shifts'] for r in rows),
+        'late': sum(r['late'] for r in rows),
+        'late_minutes': round(sum(r['late_minutes'] for r in rows), 1),
+        'max_late_minutes': max((r['max_late_minutes'] for r in rows), default=0),
+        'early': sum(r['early'] for r in rows),
+        'early_minutes': round(sum(r['early_minutes'] for r in rows), 1),
+        'missed_checkouts': sum(r['missed_checkouts'] for r in rows),
+    }
+    summary['on_time_rate'] = (round((summary['shifts'] - summary['late']) / summary['shifts'] * 100, 1)
+                               if summary['shifts'] else 0.0)
+    return summary
+
+
+@sharding.cross_site(sharding.tagged_rows)
+def compliance_employees(start_date, end_date, grace):
+    """Per-employee compliance rows for the range, scored and aggregated in one SQL query"""
+    punches = compliance_punches(start_date, end_date).subquery('punches')
+    is_late = punches.c.minutes_late > grace
+    is_early = punches.c.minutes_early > grace
+
+    rows = db.session.execute(
+        db.select(
+            User.id, User.full_name, User.username, User.department,
+            db.func.count(),
+            db.func.sum(db.case((is_late, 1), else_=0)),
+            db.func.sum(db.case((is_late, punches.c.minutes_late), else_=0)),
+            db.func.max(punches.c.minutes_late),
+            db.func.sum(db.case((is_early, 1), else_=0)),
+            db.func.sum(db.case((is_early, punches.c.minutes_early), else_=0)),
+            db.func.sum(punches.c.missed_checkout),
+        )
+        .join(punches, punches.c.user_id == User.id)
+        .where(User.role == 'employee')
+        .group_by(User.id)).all()
+
+    employees = []
+    for (user_id, name, username, department, shifts, late, late_minutes, max_late,
+         early, early_minutes, missed) in rows:
+        employees.append({
+            'id': user_id,
+            'name': name,
+            'username': username,
+            'department': department or '-',
+            'shifts': shifts,
+            'late': late,
+            'late_minutes': round(late_minutes, 1),
+            'max_late_minutes': round(max_late or 0, 1),
+            'early': early,
+            'early_minutes': round(early_minutes, 1),
+            'missed_checkouts': missed,
+            'on_time_rate': round((shifts - late) / shifts * 100, 1),
+        })
+    return employees
+
+
+def get_compliance_report(start_date, end_date):
+    """Late arrivals, early departures and missed check-outs per employee and department.
+
+    Punches are scored and aggregated per employee in SQL; the department
+    and overall rows are sums of the employee rows.
+    """
+    grace = current_app.config['COMPLIANCE_GRACE_MINUTES']
+    employees = compliance_employees(start_date, end_date, grace)
+    employees.sort(key=lambda e: (-e['late'], e['name']))
+
+    by_department = {}
+    for emp in employees:
+        by_department.setdefault(emp['department'], []).append(emp)
+    departments = [dict(_compliance_summary(rows), department=name)
+                   for name, rows in sorted(by_department.items())]
+
+    report = {
+        'employees': employees,
+        'departments': departments,
+        'overall': _compliance_summary(employees),
+        'grace_minutes': grace,
+        'date_from': start_date.strftime('%Y-%m-%d'),
+        'date_to': end_date.strftime('%Y-%m-%d'),
+    }
+    if sharding.all_sites_selected():
+        report['sites'] = sharding.sites()
+    return report
+
+
+def merge_compliance_incidents(results):
+    return sorted((tuple(row) + (site,) for site, rows in results for row in rows),
+                  key=lambda row: (row[3], row[0]))
+
+
+@sharding.cross_site(merge_compliance_incidents)
+def compliance_incidents(start_date, end_date, grace):
+    """Every late arrival, early departure and missed check-out in the range, by date and name"""
+    punches = compliance_punches(start_date, end_date).subquery('punches')
+    return db.session.execute(
+        db.select(User.full_name, User.username, User.department, punches.c.date,
+                  punches.c.shift_start, punches.c.shift_end, punches.c.check_in, punches.c.check_out,
+                  punches.c.minutes_late, punches.c.minutes_early, punches.c.missed_checkout)
+        .join(User, User.id == punches.c.user_id)
+        .where(User.role == 'employee',
+               db.or_(punches.c.minutes_late > grace, punches.c.minutes_early > grace,
+                      punches.c.missed_checkout == 1))
+        .order_by(punches.c.date, User.full_name)).all()
+
+
+DEPARTMENT_FIGURES = ('headcount', 'present_now', 'checked_in_today', 'present', 'absent', 'leave', 'total_hours')
+
+
+def merge_department_figures(results):
+    """Add up each department's figures across sites"""
+    merged = {}
+    for site, rows in results:
+        for row in rows:
+            into = merged.setdefault(row['department'], dict.fromkeys(DEPARTMENT_FIGURES, 0))
+            for key in DEPARTMENT_FIGURES:
+                into[key] += row[key]
+    return [dict(figures, department=name) for name, figures in merged.items()]
+
+
+@sharding.cross_site(merge_department_figures)
+def department_figures(month, year):
+    """Raw headcount, presence and month totals per department.
+
+    Each figure is one GROUP BY department query; the employee side is served
+    by the (role, department) index.
+    """
+    first_day, last_day = month_bounds(month, year)
+    today = datetime.utcnow().date()
+    rows = {}
+
+    def row(name):
+        return rows.setdefault(name or '-', {
+            'department': name or '-', 'headcount': 0, 'present_now': 0, 'checked_in_today': 0,
+            'present': 0, 'absent': 0, 'leave': 0, 'total_hours': 0.0,
+        })
+
+    for name, headcount in db.session.query(User.department, db.func.count()).filter(
+            User.role == 'employee', User.is_active == True).group_by(User.department):
+        row(name)['headcount'] = headcount
+
+    for name, checked_in, present_now in db.session.query(
+            User.department,
+            db.func.count(Attendance.check_in),
+            db.func.sum(db.case((db.and_(Attendance.check_in.isnot(None), Attendance.check_out.is_(None)), 1), else_=0)),
+    ).join(User, User.id == Attendance.user_id).filter(
+            Attendance.date == today, User.role == 'employee').group_by(User.department):
+        row(name).update(checked_in_today=checked_in, present_now=present_now or 0)
+
+    Att = attendance_for_range(first_day, last_day)
+    hours = (db.func.julianday(Att.check_out) - db.func.julianday(Att.check_in)) * 24
+    for name, present, absent, leave, total_hours in db.session.query(
+            User.department,
+            db.func.sum(db.case((Att.status == 'present', 1), else_=0)),
+            db.func.sum(db.case((Att.status == 'absent', 1), else_=0)),
+            db.func.sum(db.case((Att.status == 'leave', 1), else_=0)),
+            db.func.sum(db.case((Att.check_out > Att.check_in, hours), else_=0)),
+    ).join(User, User.id == Att.user_id).filter(
+            Att.date >= first_day, Att.date <= last_day, User.role == 'employee').group_by(User.department):
+        row(name).update(present=present, absent=absent, leave=leave, total_hours=total_hours or 0.0)
+
+    return list(rows.values())
+
+
+def get_department_report(month, year):
+    """Headcount, presence right now, and hours/absence for the month per department"""
+    departments = sorted(department_figures(month, year), key=lambda r: r['department'])
+    for dept in departments:
+        recorded = dept['present'] + dept['absent'] + dept['leave']
+        dept['absence_rate'] = round(dept['absent'] / recorded * 100, 1) if recorded else 0.0
+        dept['average_hours'] = round(dept['total_hours'] / dept['headcount'], 2) if dept['headcount'] else 0.0
+        dept['total_hours'] = round(dept['total_hours'], 2)
+
+    totals = {key: sum(d[key] for d in departments)
+              for key in ('headcount', 'present_now', 'checked_in_today', 'present', 'absent', 'leave')}
+    totals['total_hours'] = round(sum(d['total_hours'] for d in departments), 2)
+    recorded = totals['present'] + totals['absent'] + totals['leave']
+    totals['absence_rate'] = round(totals['absent'] / recorded * 100, 1) if recorded else 0.0
+
+    report = {
+        'departments': departments,
+        'totals': totals,
+        'month': month,
+        'year': year,
+    }
+    if sharding.all_sites_selected():
+        report['sites'] = sharding.sites()
+    return report
+
+
+def merge_monthly_reports(results):
+    """Add up the summary and daily counts of every site"""
+    merged = dict(results[0][1], summary=dict.fromkeys(results[0][1]['summary'], 0),
+                  daily_stats={date: dict.fromkeys(day, 0) for date, day in results[0][1]['daily_stats'].items()},
+                  sites=sharding.sites())
+    for site, report in results:
+        for key, value in report['summary'].items():
+            merged['summary'][key] += value
+        for date, day in report['daily_stats'].items():
+            for key, value in day.items():
+                merged['daily_stats'][date][key] += value
+    return merged
+
+
+@sharding.cross_site(merge_monthly_reports)
+def get_monthly_report(month, year):
+    """Generate monthly attendance summary report"""
+    from calendar import monthrange
+    
+    first_day = datetime(year, month, 1).date()
+    last_day = datetime(year, month, monthrange(year, month)[1]).date()
+    
+    Att = attendance_for_range(first_day, last_day)
+    records = db.session.query(Att).filter(
+        Att.date >= first_day,
+        Att.date <= last_day
+    ).all()
+    
+    summary = {
+        'total_records': len(records),
+        'total_present': len([r for r in records if r.status == 'present']),
+        'total_absent': len([r for r in records if r.status == 'absent']),
+        'total_leave': len([r for r in records if r.status == 'leave']),
+    }
+    
+    # Daily breakdown
+    daily_stats = {}
+    for day in range(1, monthrange(year, month)[1] + 1):
+        date = datetime(year, month, day).date()
+        day_records = [r for r in records if r.date == date]
+        daily_stats[date.strftime('%Y-%m-%d')] = {
+            'present': len([r for r in day_records if r.status == 'present']),
+            'absent': len([r for r in day_records if r.status == 'absent']),
+            'leave': len([r for r in day_records if r.status == 'leave']),
+        }
+    
+    return {
+        'summary': summary,
+        'daily_stats': daily_stats,
+        'month': month,
+        'year': year
+    }
+
+
+def merge_employee_summaries(results):
+    return {'employees': sharding.tagged_rows(results, 'employees'), 'sites': sharding.sites()}
+
+
+@sharding.cross_site(merge_employee_summaries)
+def get_employee_summary_report():
+    """Generate employee-wise attendance summary"""
+    employees = User.query.filter_by(role='employee').all()
+    
+    # All-time totals per employee from the monthly hours ledger
+    totals = {row[0]: row[1:] for row in db.session.query(
+        MonthlyHours.user_id,
+        db.func.sum(MonthlyHours.present),
+        db.func.sum(MonthlyHours.absent),
+        db.func.sum(MonthlyHours.leave),
+        db.func.sum(MonthlyHours.records),
+        db.func.sum(MonthlyHours.worked_seconds),
+    ).group_by(MonthlyHours.user_id)}
+    
+    employee_stats = []
+    for emp in employees:
+        total_present, total_absent, total_leave, total_records, worked_seconds = totals.get(emp.id, (0, 0, 0, 0, 0.0))
+        
+        employee_stats.append({
+            'id': emp.id,
+            'name': emp.full_name,
+            'username': emp.username,
+            'department': emp.department or '-',
+            'total_present': total_present,
+            'total_absent': total_absent,
+            'total_leave': total_leave,
+            'total_records': total_records,
+            'total_hours': round(worked_seconds / 3600, 2)
+        })
+    
+    return {'employees': employee_stats}
+
+
+def merge_working_hours_reports(results):
+    employees = sharding.tagged_rows(results, 'employees')
+    return dict(results[0][1],
+                employees=employees,
+                total_hours=round(sum(report['total_hours'] for site, report in results), 2),
+                average_hours=round(sum(e['average_hours'] for e in employees) / len(employees), 2) if employees else 0,
+                sites=sharding.sites())
+
+
+@sharding.cross_site(merge_working_hours_reports)
+def get_working_hours_report(month, year):
+    """Generate working hours report for the month"""
+    employees = User.query.filter_by(role='employee').all()
+    
+    # One ledger row per employee for the month
+    ledger = {row.user_id: row for row in MonthlyHours.query.filter_by(year=year, month=month)}
+    
+    working_hours_data = []
+    for emp in employees:
+        row = ledger.get(emp.id)
+        total_hours = row.total_hours if row else 0
+        working_days = row.working_days if row else 0
+        
+        if working_days > 0:
+            avg_hours = total_hours / working_days
+        else:
+            avg_hours = 0
+        
+        working_hours_data.append({
+            'name': emp.full_name,
+            'username': emp.username,
+            'department': emp.department or '-',
+            'working_days': working_days,
+            'total_hours': round(total_hours, 2),
+            'average_hours': round(avg_hours, 2)
+        })
+    
+    total_all_hours = sum([e['total_hours'] for e in working_hours_data])
+    avg_all_hours = sum([e['average_hours'] for e in working_hours_data]) / len(employees) if employees else 0
+    
+    return {
+        'employees': working_hours_data,
+        'total_hours': round(total_all_hours, 2),
+        'average_hours': round(avg_all_hours, 2),
+        'month': month,
+        'year': year
+    }
+
+
+def merge_absence_reports(results):
+    absences = sorted(sharding.tagged_rows(results, 'absences'), key=lambda a: (a['date'], a['employee_name']))
+    return dict(results[0][1], absences=absences, total_absences=len(absences), sites=sharding.sites())
+
+
+@sharding.cross_site(merge_absence_reports)
+def get_absence_report(month, year):
+    """Generate absence report for the month"""
+    from calendar import monthrange
+    
+    first_day = datetime(year, month, 1).date()
+    last_day = datetime(year, month, monthrange(year, month)[1]).date()
+    
+    Att = attendance_for_range(first_day, last_day)
+    absences = db.session.query(Att).filter(
+        Att.date >= first_day,
+        Att.date <= last_day,
+        Att.status == 'absent'
+    ).all()
+    
+    absence_data = []
+    for absence in absences:
+        employee = User.query.get(absence.user_id)
+        absence_data.append({
+            'employee_name': employee.full_name,
+            'username': employee.username,
+            'department': employee.department or '-',
+            'date': absence.date.strftime('%Y-%m-%d'),
+            'day': absence.date.strftime('%A'),
+            'notes': absence.notes or '-'
+        })
+    
+    return {
+        'absences': absence_data,
+        'total_absences': len(absence_data),
+        'month': month,
+        'year': year
+}
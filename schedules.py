@@ -0,0 +1,112 @@
+"""Effective shifts: the weekly rota with dated overrides and company holidays applied.
+
+For an employee and a day, an override covering the day wins (its shift,
+or a day off when it has no times); otherwise a holiday is a day off;
+otherwise the active weekly rota for that weekday applies. Overrides are
+date intervals indexed on (user_id, date_from, date_to) and holidays are
+indexed by date, so resolving one (employee, day) is a few index lookups
+inside SQLite. ``effective_shifts`` resolves every employee and day of a
+range in one statement, and ``join_effective_shift`` adds the effective
+shift to any query that already has (user_id, date) rows, e.g. attendance.
+"""
+import functools
+from datetime import date
+
+from models import db, Rota, RotaOverride, Holiday
+
+# In strftime('%w') order
+WEEKDAYS = ('Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+
+
+def weekday_name(day):
+    """Rota day_of_week ('Monday', ...) of a date column or expression"""
+    return db.case(dict(enumerate(WEEKDAYS)), value=db.cast(db.func.strftime('%w', day), db.Integer))
+
+
+def weekly_shifts(user_ids=None):
+    """Active rota per (user_id, day_of_week); earliest start and latest end if someone has several"""
+    query = db.select(
+        Rota.user_id, Rota.day_of_week,
+        db.func.min(Rota.shift_start).label('shift_start'),
+        db.func.max(Rota.shift_end).label('shift_end'),
+    ).where(Rota.is_active == True)
+    if user_ids is not None:
+        query = query.where(Rota.user_id.in_(user_ids))
+    return query.group_by(Rota.user_id, Rota.day_of_week).subquery('weekly_shifts')
+
+
+def join_effective_shift(query, user_id, day, user_ids=None):
+    """Outer-join ``query`` to what decides the shift of ``user_id`` on ``day``.
+
+    Returns the joined query and (shift_start, shift_end) expressions, which
+    are NULL on days off. ``user_ids`` limits the weekly rota that is read
+    when ``query`` only covers those employees.
+    """
+    override = RotaOverride.__table__.alias('override')
+    holiday = Holiday.__table__.alias('holiday_on_day')
+    weekly = weekly_shifts(user_ids)
+    query = query.outerjoin(override, db.and_(override.c.user_id == user_id, override.c.date_from <= day,
+                                              override.c.date_to >= day)) \
+        .outerjoin(holiday, holiday.c.date == day) \
+        .outerjoin(weekly, db.and_(weekly.c.user_id == user_id, weekly.c.day_of_week == weekday_name(day)))
+
+    def column(name):
+        return db.case((override.c.id.isnot(None), override.c[name]), (holiday.c.id.isnot(None), db.null()),
+                       else_=weekly.c[name])
+
+    return query, column('shift_start'), column('shift_end')
+
+
+def effective_shifts(start_date, end_date, user_ids=None):
+    """Select of (user_id, date, shift_start, shift_end) for every shift worked between start_date and end_date.
+
+    Candidate (employee, day) pairs come from the weekly rota and from
+    overrides with a shift; each is then resolved with
+    ``join_effective_shift`` and days off are dropped. The range and
+    ``user_ids`` are the ``start_date``, ``end_date`` and ``user_ids`` bind
+    parameters, so the statement can be run again with other values.
+    """
+    days = db.select(db.bindparam('start_date', start_date.isoformat(), db.String).label('day')).cte(
+        'days', recursive=True)
+    days = days.union_all(db.select(db.func.date(days.c.day, '+1 day')).where(
+        days.c.day < db.bindparam('end_date', end_date.isoformat(), db.String)))
+
+    rostered = db.select(Rota.user_id, days.c.day).join(
+        days, Rota.day_of_week == weekday_name(days.c.day)).where(Rota.is_active == True)
+    overridden = db.select(RotaOverride.user_id, days.c.day).join(
+        days, days.c.day.between(RotaOverride.date_from, RotaOverride.date_to)).where(
+        RotaOverride.shift_start.isnot(None))
+    if user_ids is not None:
+        user_ids = db.bindparam('user_ids', list(user_ids), expanding=True)
+        rostered = rostered.where(Rota.user_id.in_(user_ids))
+        overridden = overridden.where(RotaOverride.user_id.in_(user_ids))
+    candidates = db.union(rostered, overridden).subquery('candidates')
+
+    query, shift_start, shift_end = join_effective_shift(
+        db.select(candidates.c.user_id, db.type_coerce(candidates.c.day, db.Date).label('date')),
+        candidates.c.user_id, candidates.c.day, user_ids)
+    shifts = query.add_columns(shift_start.label('shift_start'), shift_end.label('shift_end')).subquery(
+        'effective_shifts')
+    return db.select(shifts).where(shifts.c.shift_start.isnot(None))
+
+
+@functools.cache
+def _shift_for_statement():
+    # Built once: constructing the statement costs more than running it
+    shifts = effective_shifts(date.min, date.min, []).subquery()
+    return db.select(shifts.c.shift_start, shifts.c.shift_end)
+
+
+def shift_for(user_id, day):
+    """Row with the shift_start and shift_end of an employee's effective shift on ``day``, or None if they're off"""
+    return db.session.execute(_shift_for_statement(), {
+        'start_date': day.isoformat(), 'end_date': day.isoformat(), 'user_ids': [user_id]}).first()
+
+
+def overlapping_override(user_id, date_from, date_to, exclude_id=None):
+    """An existing override of the employee that shares a day with date_from..date_to, if any"""
+    query = RotaOverride.query.filter(RotaOverride.user_id == user_id, RotaOverride.date_from <= date_to,
+                                      RotaOverride.date_to >= date_from)
+    if exclude_id is not None:
+        query = query.filter(RotaOverride.id != exclude_id)
+    return query.first()
@@ -0,0 +1,158 @@
+"""One database per site, with cross-site reports fanned out in parallel.
+
+Each site in ``SITES`` keeps its users, rotas and attendance in its own
+database (shard). The first site is the primary database; every other site
+gets a ``site_<code>`` bind plus a ``site_<code>_read`` bind for read-only
+views. ``use_site`` points ``db.session`` at a site for the rest of the app
+context by setting ``g.binds``, which ``read_routing.RoutingSession`` reads.
+
+Report functions decorated with ``@cross_site(merge)`` run once per site in
+worker threads, each with its own app context and session, when an admin
+has selected all sites; ``merge`` combines the per-site results.
+"""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import wraps
+
+import click
+import sqlalchemy as sa
+from flask import current_app, g, has_app_context
+
+from read_routing import READ_BIND, read_only_url
+
+ALL_SITES = 'all'
+SITE_CODE = re.compile(r'^[a-z0-9_]+$')
+
+
+def _site_url(primary_url, site):
+    """Default database of a site: attendance_<site>.db beside the primary SQLite file"""
+    url = sa.engine.make_url(primary_url)
+    if url.drivername not in ('sqlite', 'sqlite+pysqlite') or url.database in (None, '', ':memory:'):
+        raise RuntimeError(f'Set SITE_{site.upper()}_DATABASE_URL for site {site!r}')
+    root, ext = os.path.splitext(url.database)
+    return url.set(database=f'{root}_{site}{ext or ".db"}').render_as_string(hide_password=False)
+
+
+def configure(app):
+    """Register a bind per additional site; call before the SQLAlchemy extension is set up."""
+    app.config.setdefault('SITES', ['main'])
+    app.config.setdefault('SITE_DATABASE_URLS', {})
+    app.config.setdefault('SITE_READ_DATABASE_URLS', {})
+    app.config.setdefault('SITE_FANOUT_WORKERS', 8)
+    for site in app.config['SITES']:
+        if site == ALL_SITES or not SITE_CODE.match(site):
+            raise RuntimeError(f'Invalid site code {site!r}: use lowercase letters, digits and _ (not "all")')
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    for site in app.config['SITES'][1:]:
+        url = (app.config['SITE_DATABASE_URLS'].get(site)
+               or _site_url(app.config['SQLALCHEMY_DATABASE_URI'], site))
+        app.config['SITE_DATABASE_URLS'][site] = url
+        write_key, read_key = bind_keys(site, app)
+        binds[write_key] = url
+        read_url = app.config['SITE_READ_DATABASE_URLS'].get(site) or read_only_url(url)
+        if read_url:
+            binds[read_key] = read_url
+
+
+def sites(app=None):
+    return (app or current_app).config['SITES']
+
+
+def default_site(app=None):
+    return sites(app)[0]
+
+
+def bind_keys(site, app=None):
+    """(write, read) bind keys of a site's databases; the first site uses the primary"""
+    if site == default_site(app):
+        return None, READ_BIND
+    return f'site_{site}', f'site_{site}_read'
+
+
+def current_site():
+    """Site whose database db.session uses in this app context"""
+    return g.get('site') or default_site()
+
+
+def use_site(site):
+    """Point db.session at ``site`` (None: the first site) for the rest of this app context."""
+    site = site or default_site()
+    if site not in sites():
+        raise ValueError(f'Unknown site {site!r}')
+    g.site = site
+    g.binds = bind_keys(site)
+    return site
+
+
+@contextmanager
+def site_context(app, site):
+    """Push a fresh app context, and so a fresh session, bound to ``site``."""
+    with app.app_context():
+        use_site(site)
+        yield
+
+
+def fan_out(fn, *args, **kwargs):
+    """Call ``fn`` once per site in parallel; returns [(site, result)] in SITES order."""
+    app = current_app._get_current_object()
+    read_only = g.get('read_only', False)
+
+    def run(site):
+        with site_context(app, site):
+            g.read_only = read_only
+            return fn(*args, **kwargs)
+
+    workers = max(1, min(len(sites()), app.config['SITE_FANOUT_WORKERS']))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(zip(sites(), pool.map(run, sites())))
+
+
+def locate(fn, *args):
+    """First site for which ``fn(*args)`` is truthy (the first site if none is)."""
+    if len(sites()) == 1:
+        return default_site()
+    return next((site for site, found in fan_out(fn, *args) if found), default_site())
+
+
+def any_site(fn, *args):
+    """Whether ``fn(*args)`` is truthy on any site, e.g. to keep a username unique across sites."""
+    if len(sites()) == 1:
+        return bool(fn(*args))
+    return any(found for _, found in fan_out(fn, *args))
+
+
+def all_sites_selected():
+    return has_app_context() and bool(g.get('all_sites'))
+
+
+def cross_site(merge):
+    """Run the decorated report on every site and ``merge([(site, result), ...])`` when all sites are selected."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not all_sites_selected():
+                return fn(*args, **kwargs)
+            return merge(fan_out(fn, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def tagged_rows(results, key=None):
+    """Rows of every site's result (or of its ``key`` item), each with a ``site`` field added"""
+    return [dict(row, site=site) for site, result in results
+            for row in (result if key is None else result[key])]
+
+
+def site_option(command):
+    """Add ``--site`` to a CLI command so that it works on that site's database."""
+    @click.option('--site', default=None, help='Site whose database to use (default: the first in SITES).')
+    @wraps(command)
+    def wrapper(*args, site=None, **kwargs):
+        try:
+            use_site(site)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--site')
+        return command(*args, **kwargs)
+    return wrapper
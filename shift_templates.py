@@ -0,0 +1,74 @@
+"""Shift templates: a weekly pattern written to many employees' rotas in one go.
+
+Applying a template makes the selected employees' active rotas match it:
+days the template covers are updated or added, and active rotas on days it
+leaves off are removed. The three steps are set-based statements (UPDATE ...
+FROM, INSERT ... SELECT and DELETE) over the employees x template days
+pattern, run in one transaction together with their change log rows, so a
+department of hundreds takes three statements instead of a form post per
+employee and weekday.
+"""
+from datetime import datetime
+
+from models import db, User, Rota, ShiftTemplateDay, CHANGE_LOG_FIELDS, record_bulk_changes
+
+
+def apply_shift_template(template_id, user_ids=(), department=None):
+    """Write template ``template_id`` to the rotas of active employees in ``user_ids`` or ``department``.
+
+    Returns a dict with the number of employees selected and the rota rows
+    added, updated and removed; employees whose rota already matches count
+    as selected but change nothing. ``department`` is compared as stored, so
+    callers pass it through ``admin.canonical_department``. Raises ValueError
+    when nobody is selected or the department has no active employees.
+    """
+    employees = (User.role == 'employee', User.is_active == True)
+    selection = []
+    if user_ids:
+        selection.append(User.id.in_(list(user_ids)))
+    if department:
+        if not db.session.query(User.id).filter(*employees, User.department == department).first():
+            raise ValueError(f'No active employees in department {department!r}.')
+        selection.append(User.department == department)
+    if not selection:
+        raise ValueError('Select employees or a department.')
+
+    targets = db.select(User.id.label('user_id'), User.site).where(
+        *employees, db.or_(*selection)).subquery('targets')
+    pattern = db.select(
+        targets.c.user_id, targets.c.site, ShiftTemplateDay.day_of_week,
+        ShiftTemplateDay.shift_start, ShiftTemplateDay.shift_end,
+    ).join(ShiftTemplateDay, ShiftTemplateDay.template_id == template_id).subquery('pattern')
+
+    rota = Rota.__table__
+    published = [rota.c[field] for field in CHANGE_LOG_FIELDS[Rota]]
+    updated = db.session.execute(rota.update().where(
+        rota.c.is_active == True,
+        rota.c.user_id == pattern.c.user_id,
+        rota.c.day_of_week == pattern.c.day_of_week,
+        db.or_(rota.c.shift_start != pattern.c.shift_start, rota.c.shift_end != pattern.c.shift_end),
+    ).values(shift_start=pattern.c.shift_start, shift_end=pattern.c.shift_end).returning(*published)).all()
+
+    added = db.session.execute(rota.insert().from_select(
+        ['user_id', 'day_of_week', 'shift_start', 'shift_end', 'is_active', 'created_at', 'site'],
+        db.select(pattern.c.user_id, pattern.c.day_of_week, pattern.c.shift_start, pattern.c.shift_end,
+                  db.true(), db.literal(datetime.utcnow(), db.DateTime), pattern.c.site).where(
+            ~db.exists().where(rota.c.is_active == True, rota.c.user_id == pattern.c.user_id,
+                               rota.c.day_of_week == pattern.c.day_of_week)),
+    ).returning(*published)).all()
+
+    removed = db.session.execute(rota.delete().where(
+        rota.c.is_active == True,
+        rota.c.user_id.in_(db.select(targets.c.user_id)),
+        rota.c.day_of_week.not_in(
+            db.select(ShiftTemplateDay.day_of_week).where(ShiftTemplateDay.template_id == template_id)),
+    ).returning(*published)).all()
+
+    # The bulk statements bypass the ORM flush hook, so log the rows they returned
+    record_bulk_changes(Rota, 'update', updated)
+    record_bulk_changes(Rota, 'insert', added)
+    record_bulk_changes(Rota, 'delete', removed)
+    employees = db.session.execute(db.select(db.func.count()).select_from(targets)).scalar()
+    db.session.commit()
+
+    return {'employees': employees, 'added': len(added), 'updated': len(updated), 'removed': len(removed)}
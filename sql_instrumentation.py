@@ -0,0 +1,167 @@
+"""Opt-in per-request SQL instrumentation.
+
+When ``SQL_INSTRUMENTATION`` is enabled, every statement executed during a
+request is counted and timed through SQLAlchemy engine events. Statements
+are fingerprinted (literals and IN-lists collapsed) so that the same query
+issued over and over in one request - the N+1 pattern - stands out. Per
+request totals are sent back as ``X-SQL-*`` response headers and logged;
+per endpoint and per fingerprint aggregates are kept in memory for the
+admin SQL stats page.
+"""
+import re
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:\?|%s|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+    """Normalise a SQL statement so that executions differing only in values match."""
+    sql = _STRING_LITERAL.sub('?', statement)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class SQLInstrumentation:
+    """Collects query counts, SQL time and repeated statements per request."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+        self.statements = {}
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQL_INSTRUMENTATION', False)
+        # A fingerprint executed at least this many times in one request is reported as N+1
+        app.config.setdefault('SQL_REPEAT_THRESHOLD', 10)
+        app.config.setdefault('SQL_MAX_FINGERPRINTS', 500)
+        app.extensions['sql_instrumentation'] = self
+        self.enabled = bool(app.config['SQL_INSTRUMENTATION'])
+        if not self.enabled:
+            return
+
+        self.repeat_threshold = int(app.config['SQL_REPEAT_THRESHOLD'])
+        self.max_fingerprints = int(app.config['SQL_MAX_FINGERPRINTS'])
+        self.logger = app.logger
+
+        # Listening on the Engine class covers every engine the app creates; the listeners are
+        # process-wide, so a second app built with the same extension must not add them again
+        if not event.contains(Engine, 'before_cursor_execute', self._before_execute):
+            event.listen(Engine, 'before_cursor_execute', self._before_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_execute)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    # ----- engine events -----
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'sql_stats' in g:
+            conn.info.setdefault('sql_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not (has_request_context() and 'sql_stats' in g):
+            return
+        started = conn.info.get('sql_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        stats = g.sql_stats
+        stats['count'] += 1
+        stats['seconds'] += elapsed
+        entry = stats['fingerprints'].setdefault(fingerprint(statement), [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+
+    # ----- request hooks -----
+    def _start_request(self):
+        g.sql_stats = {'count': 0, 'seconds': 0.0, 'fingerprints': {}, 'started': time.perf_counter()}
+
+    def _finish_request(self, response):
+        stats = g.pop('sql_stats', None)
+        if stats is None:
+            return response
+
+        request_seconds = time.perf_counter() - stats['started']
+        repeated = {sql: entry for sql, entry in stats['fingerprints'].items()
+                    if entry[0] >= self.repeat_threshold}
+        worst_repeat = max((entry[0] for entry in stats['fingerprints'].values()), default=0)
+
+        response.headers['X-SQL-Queries'] = str(stats['count'])
+        response.headers['X-SQL-Time-ms'] = f"{stats['seconds'] * 1000:.2f}"
+        response.headers['X-SQL-Max-Repeat'] = str(worst_repeat)
+
+        endpoint = request.endpoint or request.path
+        message = (f"sql endpoint={endpoint} queries={stats['count']} "
+                   f"sql_ms={stats['seconds'] * 1000:.1f} request_ms={request_seconds * 1000:.1f}")
+        if repeated:
+            sql, entry = max(repeated.items(), key=lambda item: item[1][0])
+            self.logger.warning(f'{message} n_plus_one={entry[0]}x {sql[:200]}')
+        else:
+            self.logger.info(message)
+
+        self._aggregate(endpoint, stats, request_seconds)
+        return response
+
+    def _aggregate(self, endpoint, stats, request_seconds):
+        with self._lock:
+            ep = self.endpoints.setdefault(endpoint, {
+                'endpoint': endpoint, 'requests': 0, 'request_seconds': 0.0, 'max_request_seconds': 0.0,
+                'queries': 0, 'max_queries': 0, 'sql_seconds': 0.0,
+            })
+            ep['requests'] += 1
+            ep['request_seconds'] += request_seconds
+            ep['max_request_seconds'] = max(ep['max_request_seconds'], request_seconds)
+            ep['queries'] += stats['count']
+            ep['max_queries'] = max(ep['max_queries'], stats['count'])
+            ep['sql_seconds'] += stats['seconds']
+
+            for sql, (count, seconds) in stats['fingerprints'].items():
+                st = self.statements.get(sql)
+                if st is None:
+                    if len(self.statements) >= self.max_fingerprints:
+                        continue
+                    st = self.statements[sql] = {
+                        'statement': sql, 'executions': 0, 'seconds': 0.0,
+                        'max_per_request': 0, 'endpoints': set(),
+                    }
+                st['executions'] += count
+                st['seconds'] += seconds
+                st['max_per_request'] = max(st['max_per_request'], count)
+                st['endpoints'].add(endpoint)
+
+    # ----- reporting -----
+    def slowest_endpoints(self, limit=20):
+        with self._lock:
+            rows = [dict(ep) for ep in self.endpoints.values()]
+        for row in rows:
+            row['avg_ms'] = row['request_seconds'] * 1000 / row['requests']
+            row['max_ms'] = row['max_request_seconds'] * 1000
+            row['avg_queries'] = row['queries'] / row['requests']
+            row['avg_sql_ms'] = row['sql_seconds'] * 1000 / row['requests']
+        return sorted(rows, key=lambda r: r['avg_ms'], reverse=True)[:limit]
+
+    def worst_statements(self, limit=20):
+        with self._lock:
+            rows = [dict(st, endpoints=sorted(st['endpoints'])) for st in self.statements.values()]
+        for row in rows:
+            row['total_ms'] = row['seconds'] * 1000
+            row['n_plus_one'] = row['max_per_request'] >= self.repeat_threshold
+        return sorted(rows, key=lambda r: (r['n_plus_one'], r['seconds']), reverse=True)[:limit]
+
+    def reset(self):
+        with self._lock:
+            self.endpoints.clear()
+            self.statements.clear()
+
+
+sql_instrumentation = SQLInstrumentation()
@@ -0,0 +1,119 @@
+"""Fingerprinted static URLs with long-lived caching, and precompressed copies.
+
+``url_for('static', filename=...)`` adds ``?v=<content hash>`` to the URL, so
+a changed file gets a new URL. Requests whose ``v`` matches the file's
+current hash are served with ``Cache-Control: public, max-age=<STATIC_MAX_AGE>,
+immutable``, so browsers keep the file without revalidating it; other static
+requests keep Flask's default revalidating behaviour.
+
+``flask precompress-static`` writes ``.gz`` (and with brotli installed
+``.br``) copies next to compressible static files. They are served in place
+of the original to clients that accept the encoding, as long as they are
+newer than it.
+"""
+import hashlib
+import mimetypes
+import os
+
+import click
+from flask import abort, request, send_file
+from werkzeug.security import safe_join
+
+import compression
+
+PRECOMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.xml')
+
+_hashes = {}  # path -> (mtime_ns, size, hash)
+
+
+def fingerprint(path):
+    """Short content hash of the file at ``path``, or None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    cached = _hashes.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    _hashes[path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+def precompressed(path):
+    """{encoding: path} of the up-to-date compressed copies of ``path``"""
+    mtime = os.stat(path).st_mtime_ns
+    variants = {}
+    for encoding in compression.ENCODINGS:
+        candidate = path + compression.SUFFIXES[encoding]
+        try:
+            if os.stat(candidate).st_mtime_ns >= mtime:
+                variants[encoding] = candidate
+        except OSError:
+            pass
+    return variants
+
+
+def precompress(directory):
+    """Write compressed copies of the compressible files under ``directory``; returns the number written."""
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            for encoding in compression.ENCODINGS:
+                target = path + compression.SUFFIXES[encoding]
+                packed = compression.compress(data, encoding, 11 if encoding == 'br' else 9)
+                if len(packed) >= len(data):
+                    if os.path.exists(target):
+                        os.remove(target)
+                    continue
+                with open(target, 'wb') as f:
+                    f.write(packed)
+                written += 1
+    return written
+
+
+def init_app(app):
+    app.config.setdefault('STATIC_MAX_AGE', 365 * 24 * 3600)
+
+    @app.url_defaults
+    def add_fingerprint(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            path = safe_join(app.static_folder, values['filename'])
+            digest = fingerprint(path) if path else None
+            if digest:
+                values['v'] = digest
+
+    def static(filename):
+        path = safe_join(app.static_folder, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        variants = precompressed(path)
+        encoding = compression.negotiate(tuple(variants)) if variants else None
+        if encoding:
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_file(variants[encoding], mimetype=mimetype, conditional=True)
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = app.send_static_file(filename)
+        if variants:
+            response.vary.add('Accept-Encoding')
+        if request.args.get('v') and request.args['v'] == fingerprint(path):
+            response.cache_control.public = True
+            response.cache_control.max_age = app.config['STATIC_MAX_AGE']
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return response
+
+    app.view_functions['static'] = static
+
+    @app.cli.command('precompress-static')
+    def precompress_static_command():
+        """Write .gz/.br copies of static files; rerun whenever they change."""
+        count = precompress(app.static_folder)
+        click.echo(f'Wrote {count} compressed files ({", ".join(compression.ENCODINGS)}) into {app.static_folder}.')
@@ -0,0 +1,128 @@
+"""Compiled-template and rendered-fragment caching.
+
+Jinja compiles every template to Python bytecode the first time a process
+renders it, so each new worker pays that cost again. A bytecode cache in
+``TEMPLATE_BYTECODE_CACHE_DIR`` lets later workers (and restarts) load the
+compiled code instead; ``flask compile-templates`` fills it ahead of time.
+
+Expensive blocks of a page can be cached as rendered HTML with::
+
+    {% cache 'report_tables', key %} ... {% endcache %}
+
+The block body is only rendered when ``(name, key)`` is not cached yet. The
+key must be hashable and should include a data version, so that changed data
+means a new key rather than stale output; a ``None`` key renders the block
+without caching it. Entries live in this process, are dropped least recently
+used beyond ``FRAGMENT_CACHE_SIZE`` and expire after ``FRAGMENT_CACHE_TIMEOUT``
+seconds, which also bounds how long writes the data version can't see (such
+as bulk CLI commands run in another process) stay hidden.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import click
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+import metrics
+
+FRAGMENT_CACHE = metrics.Counter(metrics.registry, 'template_fragment_cache_total',
+                                 'Template fragment cache lookups by fragment and result.', ('fragment', 'result'))
+
+
+class FragmentCache:
+    """Thread-safe LRU of rendered fragments with a per-entry timeout"""
+
+    def __init__(self, max_entries=256, timeout=3600):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires at, rendered markup)
+        self.max_entries = max_entries
+        self.timeout = timeout
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def render(self, name, key, render):
+        """Cached output of ``render()`` for the fragment ``name`` at ``key``"""
+        if key is None or self.max_entries <= 0:
+            return render()
+        value = self.get((name, key))
+        if value is not None:
+            FRAGMENT_CACHE.inc(name, 'hit')
+            return value
+        FRAGMENT_CACHE.inc(name, 'miss')
+        value = render()
+        self.set((name, key), value)
+        return value
+
+
+fragment_cache = FragmentCache()
+
+
+class FragmentCacheExtension(Extension):
+    """``{% cache name, key %}...{% endcache %}``: render the body through ``fragment_cache``"""
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        name = parser.parse_expression()
+        parser.stream.expect('comma')
+        key = parser.parse_expression()
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [name, key]), [], [], body).set_lineno(lineno)
+
+    def _render(self, name, key, caller):
+        return fragment_cache.render(name, key, caller)
+
+
+def compile_templates(app):
+    """Load every template once so that its bytecode is written to the cache; returns the count."""
+    names = app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html'))
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def init_app(app):
+    app.config.setdefault('TEMPLATE_BYTECODE_CACHE_DIR', os.path.join(app.instance_path, 'jinja_cache'))
+    app.config.setdefault('FRAGMENT_CACHE_SIZE', 256)
+    app.config.setdefault('FRAGMENT_CACHE_TIMEOUT', 3600)
+
+    directory = app.config['TEMPLATE_BYTECODE_CACHE_DIR']
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    fragment_cache.max_entries = app.config['FRAGMENT_CACHE_SIZE']
+    fragment_cache.timeout = app.config['FRAGMENT_CACHE_TIMEOUT']
+
+    @app.cli.command('compile-templates')
+    def compile_templates_command():
+        """Fill the template bytecode cache before workers start."""
+        if not app.config['TEMPLATE_BYTECODE_CACHE_DIR']:
+            raise click.ClickException('TEMPLATE_BYTECODE_CACHE_DIR is not set.')
+        click.echo(f'Compiled {compile_templates(app)} templates into {app.config["TEMPLATE_BYTECODE_CACHE_DIR"]}.')